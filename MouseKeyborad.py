@@ -1,31 +1,87 @@
 import cv2
 import time
-import mediapipe as mp
 import pyautogui
-import math
 import numpy as np
-from pynput.keyboard import Controller
 from tkinter import Tk, Button, Label, Frame
 import threading
-import speech_recognition as sr
-
-# Import our new VoiceCommandManager
-from voice_command_manager import VoiceCommandManager
+import os
+import argparse
+import queue
+
+from warm_start import WarmStart
+from frame_pipeline import HandTrackingPipeline
+from roi_tracker import RoiHandTracker
+from keyboard_overlay import KeyboardOverlay, KeyIndex, draw_keyboard_buttons
+import gesture_features as gf
+from input_injector import InputInjector
+from cursor_filters import load_filter_config, make_cursor_filter
+from mode_controller import ControllerState, ModeController
+from stage_metrics import metrics
+from idle_scheduler import IdleScheduler
+from shared_preview import SharedFramePublisher
+from hand_detectors import AdaptiveDetector, default_detector_factories, supports_pinch
+from word_predictor import WordPredictor
+from text_buffer import TextBuffer
+from landmark_trace import TraceRecorder
+
+# Camera, hand model, keyboard and speech are built by factories below instead of at
+# import time; startup.start() loads them in parallel while the menu is already up
+startup = WarmStart()
+
+# Set once the hand model has loaded
+mpHands = None
+mpDraw = None
+hands = None
+hand_tracker = None
+cap = None
+
+# "auto" picks the most accurate detector whose time per frame fits DETECTOR_BUDGET_SHARE of a
+# TARGET_FPS frame and steps down at runtime when it stops fitting; or pin one of
+# "mediapipe_full", "mediapipe_lite", "contour"
+HAND_DETECTOR = "auto"
+TARGET_FPS = 30
+DETECTOR_BUDGET_SHARE = 0.6
+
+# Run hands.process on a crop around the last hand instead of the full 1280x720 frame;
+# ROI_INPUT_SIZE also downscales that crop (None keeps it at camera resolution)
+USE_ROI_TRACKING = True
+ROI_INPUT_SIZE = 320
+
+# With no hand in view for IDLE_AFTER_FRAMES frames, drop to IDLE_FPS at 640x360 and detect on
+# every IDLE_DETECT_EVERY-th frame; a hand brings back full rate within IDLE_DETECT_EVERY / IDLE_FPS s
+USE_IDLE_SCHEDULER = True
+IDLE_AFTER_FRAMES = 45
+IDLE_FPS = 10
+IDLE_DETECT_EVERY = 3
+
+# Per-stage timings: the overlay can also be toggled with "m"; METRICS_DUMP_FILE (.csv or .json)
+# is rewritten every METRICS_DUMP_INTERVAL seconds and METRICS_PORT serves /metrics for Prometheus
+SHOW_METRICS_OVERLAY = False
+METRICS_DUMP_FILE = None
+METRICS_DUMP_INTERVAL = 10
+METRICS_PORT = None
+
+# Completions offered above the text box; build words.bin with `python word_predictor.py build`,
+# without it a small built-in word list is used. Learned words are kept in the user's home directory
+PREDICTION_SLOTS = 3
+DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "words.bin")
+
+# Mouse and key events are delivered from their own thread so OS input calls never stall the camera loop;
+# the keyboard controller is attached once pynput has loaded
+injector = InputInjector(pyautogui, None)
+screen_width, screen_height = pyautogui.size()
 
-# Initialize Mediapipe
-mpHands = mp.solutions.hands
-hands = mpHands.Hands(static_image_mode=False, max_num_hands=1,
-                      min_detection_confidence=0.7, min_tracking_confidence=0.7)
-mpDraw = mp.solutions.drawing_utils
+# Cursor smoothing/prediction settings; drop a cursor_filter.json next to this file to tune per machine
+CURSOR_FILTER_CONFIG = load_filter_config(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       "cursor_filter.json"))
 
-keyboard = Controller()
-cap = cv2.VideoCapture(0)
-cap.set(3, 1280)
-cap.set(4, 720)
-screen_width, screen_height = pyautogui.size()
+# One microphone shared by voice commands and dictation, and the voice command manager;
+# both stay None until speech has loaded
+audio_hub = None
+voice_manager = None
 
-# Initialize voice command manager
-voice_manager = VoiceCommandManager()
+# Word completion for the keyboard, None until its dictionary is mapped
+predictor = None
 
 class ButtonObj:
     def __init__(self, pos, text, size=[70, 70]):
@@ -38,334 +94,631 @@ keys = [["Q", "W", "E", "R", "T", "Y", "U", "I", "O", "P", "CL"],
         ["Z", "X", "C", "V", "B", "N", "M", ",", ".", "/", "APR"],
         ["MIC", "CLR", "CMD"]]  # Added CMD button for voice commands
 
-button_list = [ButtonObj([100 * j + 10, 100 * i + 10], key)
+key_buttons = [ButtonObj([100 * j + 10, 100 * i + 10], key)
                for i in range(len(keys)) for j, key in enumerate(keys[i])]
 
-def draw_keyboard_buttons(img, button_list):
-    for button in button_list:
-        x, y = button.pos
-        w, h = button.size
-        cv2.rectangle(img, button.pos, (x + w, y + h), (96, 96, 96), cv2.FILLED)
-        cv2.putText(img, button.text, (x + 10, y + 60),
-                    cv2.FONT_HERSHEY_PLAIN, 2, (255, 255, 255), 2)
-    return img
+# Word predictions sit next to the last row; their text changes as the user types, so they
+# are drawn on each frame instead of being part of the cached keyboard layer
+prediction_buttons = [ButtonObj([310 + 230 * i, 310], "", size=[220, 70]) for i in range(PREDICTION_SLOTS)]
+button_list = key_buttons + prediction_buttons
 
-def calculate_distance(point1, point2):
-    x1, y1 = point1
-    x2, y2 = point2
-    return math.hypot(x2 - x1, y2 - y1)
+# Position -> button lookup, so hit-testing doesn't scan every button
+key_index = KeyIndex(button_list)
+
+# Controller of the running session; voice commands post mode switches to it
+controller = None
 
 def switch_mode_callback(mode_name):
     """Callback function for voice command mode switching"""
-    if mode_name == "mouse":
-        cv2.destroyAllWindows()
-        mouse_mode()
-    elif mode_name == "keyboard":
-        cv2.destroyAllWindows()
-        keyboard_mode()
-
-def main_menu():
-    # Set the callback function for mode switching
-    voice_manager.set_mode_switch_callback(switch_mode_callback)
-    
-    root = Tk()
-    root.title("Hand Gesture Controller")
-    root.geometry("500x400")
-    root.configure(bg="#2E3B4E")
-
-    def set_mode_to_mouse():
-        root.destroy()
-        mouse_mode()
-
-    def set_mode_to_keyboard():
-        root.destroy()
-        keyboard_mode()
-        
-    def toggle_voice_commands():
-        if voice_manager.listening:
-            voice_manager.stop_listening()
-            voice_cmd_btn.configure(text="Enable Voice Commands", bg="#4CAF50")
+    # Called on the voice thread: only queue the switch, the controller loop performs it
+    if controller is not None:
+        controller.switch_to(mode_name)
+
+def open_camera():
+    global cap
+    cap = cv2.VideoCapture(0)
+    cap.set(3, 1280)
+    cap.set(4, 720)
+    # The first read is the slow one (driver start-up, auto exposure), so pay it here
+    cap.read()
+    return cap
+
+def build_hands():
+    global mpHands, mpDraw, hands
+    try:
+        import mediapipe as mp
+        mpHands = mp.solutions.hands
+        mpDraw = mp.solutions.drawing_utils
+    except ImportError:
+        print("mediapipe is not installed, falling back to the contour hand tracker")
+
+    factories = default_detector_factories(min_detection_confidence=0.7, min_tracking_confidence=0.7)
+    if HAND_DETECTOR != "auto":
+        factories = [(name, factory) for name, factory in factories if name == HAND_DETECTOR]
+    detector = AdaptiveDetector(factories, 1000 / TARGET_FPS * DETECTOR_BUDGET_SHARE,
+                                on_change=lambda name: print(f"Hand detector: {name}"))
+    # Timing on a blank frame also gets graph setup out of the way before the first real frame
+    detector.select(np.zeros((720, 1280, 3), dtype=np.uint8))
+    hands = detector
+    return hands
+
+def build_hand_tracker():
+    global hand_tracker
+    model = startup.get("hands")
+    hand_tracker = RoiHandTracker(model, input_size=ROI_INPUT_SIZE) if USE_ROI_TRACKING else model
+    return hand_tracker
+
+def build_keyboard():
+    from pynput.keyboard import Controller
+    injector.keyboard = Controller()
+    return injector.keyboard
+
+def build_voice():
+    global audio_hub, voice_manager
+    from voice_command_manager import VoiceCommandManager
+    from audio_hub import AudioHub
+    hub = AudioHub()
+    manager = VoiceCommandManager(audio_hub=hub)
+    manager.set_mode_switch_callback(switch_mode_callback)
+    audio_hub, voice_manager = hub, manager
+    # Keep the shared microphone open and calibrated from the start
+    hub.start_background()
+    return manager
+
+def build_predictor():
+    global predictor
+    predictor = WordPredictor.load(DICTIONARY_PATH)
+    return predictor
+
+startup.add("camera", open_camera)
+startup.add("hands", build_hands)
+startup.add("hand_tracker", build_hand_tracker)
+startup.add("keyboard", build_keyboard)
+startup.add("voice", build_voice)
+startup.add("predictor", build_predictor)
+
+def draw_hand(frame, hand_landmarks):
+    if mpDraw is not None:
+        mpDraw.draw_landmarks(frame, hand_landmarks, mpHands.HAND_CONNECTIONS)
+        return
+    # Without mediapipe there are no connections to draw, just the tracked points
+    frame_height, frame_width = frame.shape[:2]
+    for lm in hand_landmarks.landmark:
+        cv2.circle(frame, (int(lm.x * frame_width), int(lm.y * frame_height)), 6, (0, 0, 255), cv2.FILLED)
+
+def draw_voice_status(frame, x):
+    if voice_manager is None:
+        cv2.putText(frame, "Voice: loading...", (x, 50),
+                    cv2.FONT_HERSHEY_PLAIN, 1.5, (0, 255, 255), 2)
+    elif voice_manager.listening:
+        status_color = (0, 255, 0)  # Green when active
+        cv2.putText(frame, f"Voice: {voice_manager.status_message}", (x, 50), 
+                  cv2.FONT_HERSHEY_PLAIN, 1.5, status_color, 2)
+    else:
+        status_color = (0, 0, 255)  # Red when inactive
+        cv2.putText(frame, "Voice commands disabled", (x, 50), 
+                  cv2.FONT_HERSHEY_PLAIN, 1.5, status_color, 2)
+
+def toggle_voice_commands():
+    if voice_manager is None:
+        return
+    if voice_manager.listening:
+        voice_manager.stop_listening()
+    else:
+        voice_manager.start_listening()
+
+def track_startup(results):
+    """Log startup timings once the first hand has been tracked"""
+    if results.multi_hand_landmarks and not startup.reported:
+        startup.mark("first_tracked_frame")
+        startup.reported = True
+        print(startup.report())
+
+class MainMenu(ControllerState):
+    """Tk mode menu, pumped by the controller loop instead of its own mainloop"""
+    uses_camera = False
+
+    def __init__(self):
+        self.root = None
+        self.controller = None
+
+    def _build(self):
+        root = Tk()
+        root.title("Hand Gesture Controller")
+        root.geometry("500x400")
+        root.configure(bg="#2E3B4E")
+        root.protocol("WM_DELETE_WINDOW", self.controller.quit)
+
+        def set_mode_to_mouse():
+            self.controller.switch_to("mouse")
+
+        def set_mode_to_keyboard():
+            self.controller.switch_to("keyboard")
+
+        def toggle_voice():
+            toggle_voice_commands()
+            self._update_voice_button()
+
+        Label(root, text="Hand Gesture Controller", font=("Arial", 20, "bold"),
+              bg="#2E3B4E", fg="white").pack(pady=20)
+
+        Label(root, text="Select Your Control Mode:", font=("Arial", 14),
+              bg="#2E3B4E", fg="white").pack(pady=10)
+
+        Button(root, text="Mouse Control", command=set_mode_to_mouse, width=20, height=2,
+               bg="#4CAF50", fg="white", font=("Arial", 12)).pack(pady=10)
+
+        Button(root, text="Keyboard Control", command=set_mode_to_keyboard, width=20, height=2,
+               bg="#2196F3", fg="white", font=("Arial", 12)).pack(pady=10)
+
+        self.voice_cmd_btn = Button(root, text="Enable Voice Commands", command=toggle_voice,
+                                    width=20, height=2, bg="#4CAF50", fg="white", font=("Arial", 12))
+        self.voice_cmd_btn.pack(pady=20)
+
+        Label(root, text="Voice commands let you control your computer with voice",
+              font=("Arial", 10), bg="#2E3B4E", fg="#BBBBBB").pack(pady=5)
+
+        self.loading_label = Label(root, text="", font=("Arial", 10), bg="#2E3B4E", fg="#FFC107")
+        self.loading_label.pack(pady=5)
+        self.root = root
+
+    def _update_voice_button(self):
+        # Voice commands can also be toggled from keyboard mode, so sync on every visit
+        if voice_manager is None:
+            self.voice_cmd_btn.configure(text="Voice Loading...", bg="#757575")
+        elif voice_manager.listening:
+            self.voice_cmd_btn.configure(text="Disable Voice Commands", bg="#F44336")
         else:
-            voice_manager.start_listening()
-            voice_cmd_btn.configure(text="Disable Voice Commands", bg="#F44336")
-
-    Label(root, text="Hand Gesture Controller", font=("Arial", 20, "bold"),
-          bg="#2E3B4E", fg="white").pack(pady=20)
-
-    Label(root, text="Select Your Control Mode:", font=("Arial", 14),
-          bg="#2E3B4E", fg="white").pack(pady=10)
-
-    Button(root, text="Mouse Control", command=set_mode_to_mouse, width=20, height=2,
-           bg="#4CAF50", fg="white", font=("Arial", 12)).pack(pady=10)
-
-    Button(root, text="Keyboard Control", command=set_mode_to_keyboard, width=20, height=2,
-           bg="#2196F3", fg="white", font=("Arial", 12)).pack(pady=10)
-           
-    voice_cmd_btn = Button(root, text="Enable Voice Commands", command=toggle_voice_commands, 
-                  width=20, height=2, bg="#4CAF50", fg="white", font=("Arial", 12))
-    voice_cmd_btn.pack(pady=20)
-
-    Label(root, text="Voice commands let you control your computer with voice", 
-          font=("Arial", 10), bg="#2E3B4E", fg="#BBBBBB").pack(pady=5)
-
-    root.mainloop()
-
-def mouse_mode():
-    last_left_click_time = 0
-    last_right_click_time = 0
-    click_threshold = 40
-    smoothening = 5
-    prev_loc_x, prev_loc_y = 0, 0
-    
-    # Pre-defined help text for mouse mode
-    help_text = ["Mouse Mode Controls:",
-                "- Move index finger to move cursor",
-                "- Pinch index & middle fingers for left click",
-                "- Pinch thumb & index finger for right click",
-                "- Say 'switch to keyboard' to change modes",
-                "- Press ESC for main menu"]
-
-    while True:
-        success, frame = cap.read()
-        if not success:
-            break
-
-        frame = cv2.flip(frame, 1)
-        frame_height, frame_width, _ = frame.shape
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = hands.process(rgb)
+            self.voice_cmd_btn.configure(text="Enable Voice Commands", bg="#4CAF50")
+
+    def enter(self, controller):
+        self.controller = controller
+        if self.root is None:
+            self._build()
+        else:
+            self.root.deiconify()
+        self._update_voice_button()
+        self.root.update()
+        startup.mark("menu_shown")
+
+    def exit(self):
+        if self.root is not None:
+            self.root.withdraw()
+            self.root.update()
+
+    def step(self, tracked):
+        pending = startup.pending()
+        loading = f"Loading: {', '.join(pending)}" if pending else ""
+        if self.loading_label.cget("text") != loading:
+            self.loading_label.configure(text=loading)
+            self._update_voice_button()
+        self.root.update()
+        time.sleep(0.01)  # Nothing else runs while the menu is up
+        return None
+
+    def close(self):
+        if self.root is not None:
+            self.root.destroy()
+            self.root = None
+
+class MouseMode(ControllerState):
+    """Gesture mouse: the index finger moves the cursor, pinches click"""
+    title = "Mouse Control"
+
+    def __init__(self):
+        self.click_threshold = 40
+        self.cursor_filter = make_cursor_filter(CURSOR_FILTER_CONFIG)
+
+        # Pre-defined help text for mouse mode
+        self.help_text = ["Mouse Mode Controls:",
+                          "- Move index finger to move cursor",
+                          "- Pinch index & middle fingers for left click",
+                          "- Pinch thumb & index finger for right click",
+                          "- Say 'switch to keyboard' to change modes",
+                          "- Press ESC for main menu"]
+
+        # Landmarks and pinch distances for the tracked hand, reused every frame
+        self.hand = gf.HandFeatures()
+        self.controller = None
+
+    def enter(self, controller):
+        self.controller = controller
+        self.last_left_click_time = 0
+        self.last_right_click_time = 0
+        self.cursor_filter.reset()
+        injector.start()
+
+    def step(self, tracked):
+        hand = self.hand
+        frame_width, frame_height = tracked.width, tracked.height
+        results = tracked.results
+        track_startup(results)
+        # Nothing is drawn in headless mode unless a preview frame is due, and the
+        # mirrored pixels are only produced when something is drawn on them
+        drawing = self.controller.drawing
+        frame = tracked.frame if drawing else None
 
         if results.multi_hand_landmarks:
             hand_landmarks = results.multi_hand_landmarks[0]
-            mpDraw.draw_landmarks(frame, hand_landmarks, mpHands.HAND_CONNECTIONS)
-            landmarks = [(lm.x * frame_width, lm.y * frame_height) for lm in hand_landmarks.landmark]
+            if drawing:
+                with metrics.time("draw"):
+                    draw_hand(frame, hand_landmarks)
+            features = hand.update(hand_landmarks, frame_width, frame_height)
 
-            index_finger = landmarks[8]
-            middle_finger = landmarks[12]
-            thumb = landmarks[4]
+            index_finger = hand.point(gf.INDEX_TIP)
 
             screen_x = np.interp(index_finger[0], (0, frame_width), (0, screen_width))
             screen_y = np.interp(index_finger[1], (0, frame_height), (0, screen_height))
 
-            loc_x = prev_loc_x + (screen_x - prev_loc_x) / smoothening
-            loc_y = prev_loc_y + (screen_y - prev_loc_y) / smoothening
-            pyautogui.moveTo(loc_x, loc_y)
-            prev_loc_x, prev_loc_y = loc_x, loc_y
+            # Predictive filters lead the cursor by how old this frame already is
+            now = tracked.clock()
+            latency = now - tracked.captured_at
+            loc_x, loc_y = self.cursor_filter(screen_x, screen_y, tracked.captured_at, latency)
+            injector.move_to(loc_x, loc_y)
 
-            dist_index_middle = calculate_distance(index_finger, middle_finger)
-            dist_thumb_index = calculate_distance(thumb, index_finger)
+            dist_index_middle = features[gf.PINCH_INDEX_MIDDLE]
+            dist_thumb_index = features[gf.PINCH_THUMB_INDEX]
+            # The contour fallback has no real fingertips, so it only moves the cursor
+            pinch = supports_pinch(results)
 
-            if dist_index_middle < click_threshold:
-                if time.time() - last_left_click_time > 0.5:
-                    pyautogui.click(button="left")
-                    last_left_click_time = time.time()
+            if pinch and dist_index_middle < self.click_threshold:
+                if now - self.last_left_click_time > 0.5:
+                    injector.click("left")
+                    self.last_left_click_time = now
 
-            if dist_thumb_index < click_threshold:
-                if time.time() - last_right_click_time > 0.5:
-                    pyautogui.click(button="right")
-                    last_right_click_time = time.time()
+            if pinch and dist_thumb_index < self.click_threshold:
+                if now - self.last_right_click_time > 0.5:
+                    injector.click("right")
+                    self.last_right_click_time = now
+
+        if not drawing:
+            return frame
 
         # Display help text
         y_pos = 100
-        for line in help_text:
+        for line in self.help_text:
             cv2.putText(frame, line, (20, y_pos), cv2.FONT_HERSHEY_PLAIN, 1.5, (255, 255, 255), 2)
             y_pos += 30
             
         # Display voice command status
-        if voice_manager.listening:
-            status_color = (0, 255, 0)  # Green when active
-            cv2.putText(frame, f"Voice: {voice_manager.status_message}", (20, 50), 
-                      cv2.FONT_HERSHEY_PLAIN, 1.5, status_color, 2)
-        else:
-            status_color = (0, 0, 255)  # Red when inactive
-            cv2.putText(frame, "Voice commands disabled", (20, 50), 
-                      cv2.FONT_HERSHEY_PLAIN, 1.5, status_color, 2)
+        draw_voice_status(frame, 20)
 
-        cv2.imshow("Mouse Control", frame)
+        return frame
 
-        key = cv2.waitKey(1)
+    def on_key(self, key):
         if key == 27:  # ESC key
-            cv2.destroyAllWindows()
-            main_menu()
-            break
+            self.controller.switch_to("menu")
 
 listening = False
 mic_feedback = ""
-transcribed = []
+# Finished dictation phrases, handed from the speech thread to the keyboard loop
+dictation = queue.Queue(maxsize=16)
+
+def queue_dictation(text):
+    global mic_feedback
+    try:
+        dictation.put_nowait(text)
+    except queue.Full:
+        mic_feedback = "Dictation backlog full, phrase dropped."
+
+def stream_dictation(chunks, sample_rate, backend, timeout=6, phrase_time_limit=6):
+    """Dictate with a streaming backend, showing partial text while the user speaks"""
+    global mic_feedback
+    session = backend.stream(sample_rate)
+    mic_feedback = "Speak now..."
+    deadline = time.time() + timeout
+    speaking = False
+    while time.time() < deadline:
+        chunk = chunks.get(timeout=0.5)
+        if chunk is None:
+            continue
+        partial, final = session.accept(chunk)
+        if final:
+            return final
+        if partial:
+            mic_feedback = partial
+            if not speaking:
+                speaking = True
+                deadline = time.time() + phrase_time_limit
+    return session.finish()
 
 def speech_to_text_worker():
     global listening, mic_feedback
-    r = sr.Recognizer()
+    import speech_recognition as sr
+    backend = voice_manager.backend
+    # The shared hub keeps the microphone open and calibrated, so dictation starts immediately
+    hub = voice_manager.audio_hub
     retries = 1
-    with sr.Microphone() as source:
-        try:
-            mic_feedback = "Listening... adjusting noise"
-            r.adjust_for_ambient_noise(source, duration=1.5)
+    try:
+        if backend.streaming:
+            with hub.subscribe("chunk") as chunks:
+                result = stream_dictation(chunks, hub.sample_rate, backend)
+            if result:
+                queue_dictation(result)
+            else:
+                mic_feedback = "No speech detected."
+        else:
             mic_feedback = "Speak now..."
-            audio = r.listen(source, timeout=6, phrase_time_limit=6)
-            mic_feedback = "Transcribing..."
-            result = r.recognize_google(audio)
-            transcribed.append(result)
-        except sr.WaitTimeoutError:
-            if retries:
+            audio = hub.next_utterance(timeout=6)
+            while audio is None and retries:
                 retries -= 1
                 mic_feedback = "Retrying, speak again..."
-                try:
-                    audio = r.listen(source, timeout=6, phrase_time_limit=6)
-                    mic_feedback = "Transcribing..."
-                    result = r.recognize_google(audio)
-                    transcribed.append(result)
-                except:
-                    mic_feedback = "No voice detected."
-            else:
+                audio = hub.next_utterance(timeout=6)
+            if audio is None:
                 mic_feedback = "No speech detected."
-        except sr.UnknownValueError:
-            mic_feedback = "Couldn't understand you."
-        except sr.RequestError:
-            mic_feedback = "Connection error."
+            else:
+                mic_feedback = "Transcribing..."
+                result = backend.transcribe(audio)
+                queue_dictation(result)
+    except sr.UnknownValueError:
+        mic_feedback = "Couldn't understand you."
+    except sr.RequestError:
+        mic_feedback = "Connection error."
+    except Exception:
+        mic_feedback = "Microphone error."
 
     listening = False
     time.sleep(1)
     mic_feedback = ""
 
-def keyboard_mode():
-    global listening, mic_feedback
-    text = ""
-    delay = 0
-    capitalize = False
-    typing_allowed = False
-    last_button_press = None
-    
-    # Add help for voice commands
-    help_text = ["Keyboard Controls:",
-                "- Pinch over letter to type",
-                "- 'SP': Space, 'CL': Backspace",
-                "- 'APR': Toggle CAPS, 'CLR': Clear text",
-                "- 'MIC': Voice dictation, 'CMD': Toggle voice commands",
-                "- Say 'switch to mouse' to change modes"]
-
-    while True:
-        success, frame = cap.read()
-        if not success:
-            break
-
-        frame = cv2.flip(frame, 1)
-        frame_height, frame_width, _ = frame.shape
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = hands.process(rgb)
-
-        frame = draw_keyboard_buttons(frame, button_list)
+class KeyboardMode(ControllerState):
+    """Gesture keyboard: pinch over a key to type it"""
+    title = "Keyboard Control"
+
+    def __init__(self):
+        # Only the tail is kept for display; the text itself is typed into the focused app
+        self.text = TextBuffer(limit=256)
+        self.delay = 0
+        self.capitalize = False
+        self.last_button_press = None
+
+        # Add help for voice commands
+        self.help_text = ["Keyboard Controls:",
+                          "- Pinch over letter to type",
+                          "- 'SP': Space, 'CL': Backspace",
+                          "- 'APR': Toggle CAPS, 'CLR': Clear text",
+                          "- 'MIC': Voice dictation, 'CMD': Toggle voice commands",
+                          "- Pinch a suggestion to finish the word",
+                          "- Say 'switch to mouse' to change modes"]
+
+        # Buttons and help text are drawn once and pasted onto each frame
+        self.overlay = KeyboardOverlay(key_buttons, self.help_text)
+
+        # Landmarks and pinch distances for the tracked hand, reused every frame
+        self.hand = gf.HandFeatures()
+        self.controller = None
+
+        # Prefix and text version the prediction buttons were last filled for
+        self.predicted_prefix = None
+        self.predicted_version = None
+
+    def enter(self, controller):
+        self.controller = controller
+        self.delay = 0
+        self.last_button_press = None
+        injector.start()
+        startup.start("predictor")
+
+    def exit(self):
+        if predictor is not None:
+            predictor.save()
+
+    def update_predictions(self):
+        """Refill the prediction buttons when the word being typed has changed"""
+        if predictor is None or self.text.version == self.predicted_version:
+            return
+        self.predicted_version = self.text.version
+        prefix = WordPredictor.current_word(self.text.tail(64))
+        if prefix == self.predicted_prefix:
+            return
+        self.predicted_prefix = prefix
+        words = predictor.predict(prefix, PREDICTION_SLOTS)
+        words += [""] * (PREDICTION_SLOTS - len(words))
+        for button, word in zip(prediction_buttons, words):
+            button.text = word
+
+    def step(self, tracked):
+        global listening, mic_feedback
+        hand = self.hand
+        frame_width, frame_height = tracked.width, tracked.height
+        results = tracked.results
+
+        track_startup(results)
+        # Nothing is drawn in headless mode unless a preview frame is due, and the
+        # mirrored pixels are only produced when something is drawn on them
+        drawing = self.controller.drawing
+        frame = None
+        if drawing:
+            with metrics.time("overlay"):
+                frame = self.overlay.composite(tracked.frame, self.capitalize)
+                draw_keyboard_buttons(frame, prediction_buttons)
 
         if results.multi_hand_landmarks:
             hand_landmarks = results.multi_hand_landmarks[0]
-            mpDraw.draw_landmarks(frame, hand_landmarks, mpHands.HAND_CONNECTIONS)
-            landmarks = [(lm.x * frame_width, lm.y * frame_height) for lm in hand_landmarks.landmark]
+            if drawing:
+                with metrics.time("draw"):
+                    draw_hand(frame, hand_landmarks)
+            features = hand.update(hand_landmarks, frame_width, frame_height)
 
-            thumb = landmarks[4]
-            index_finger = landmarks[8]
-            distance = calculate_distance(thumb, index_finger)
+            thumb = hand.point(gf.THUMB_TIP)
+            index_finger = hand.point(gf.INDEX_TIP)
+            distance = features[gf.PINCH_THUMB_INDEX]
 
-            if distance < 50:
+            # The contour fallback has no real fingertips, so it can't type
+            if distance < 50 and supports_pinch(results):
                 typing_allowed = True
-                cv2.circle(frame, (int(thumb[0]), int(thumb[1])), 15, (0, 255, 0), cv2.FILLED)
-                cv2.circle(frame, (int(index_finger[0]), int(index_finger[1])), 15, (0, 255, 0), cv2.FILLED)
             else:
                 typing_allowed = False
-                last_button_press = None
+                self.last_button_press = None
 
-            if typing_allowed and delay == 0:
-                for i, button in enumerate(button_list):
-                    x, y = button.pos
-                    w, h = button.size
-                    if x < index_finger[0] < x + w and y < index_finger[1] < y + h:
+            if typing_allowed and drawing:
+                cv2.circle(frame, (int(thumb[0]), int(thumb[1])), 15, (0, 255, 0), cv2.FILLED)
+                cv2.circle(frame, (int(index_finger[0]), int(index_finger[1])), 15, (0, 255, 0), cv2.FILLED)
+
+            if typing_allowed and self.delay == 0:
+                i, button = key_index.lookup(index_finger)
+                if button is not None:
+                    if drawing:
+                        x, y = button.pos
+                        w, h = button.size
                         cv2.rectangle(frame, (x - 5, y - 5), (x + w + 5, y + h + 5), (255, 255, 255), cv2.FILLED)
                         cv2.putText(frame, button.text, (x + 20, y + 65),
                                     cv2.FONT_HERSHEY_PLAIN, 4, (0, 0, 0), 4)
 
-                        if last_button_press != i:
-                            if button.text == "SP":
-                                text += " "
-                                keyboard.press(' ')
-                                keyboard.release(' ')
-                            elif button.text == "CL":
-                                if len(text) > 0:
-                                    text = text[:-1]
-                                    keyboard.press('\b')
-                                    keyboard.release('\b')
-                            elif button.text == "APR":
-                                capitalize = not capitalize
-                            elif button.text == "CLR":
-                                text = ""
-                            elif button.text == "MIC":
-                                if not listening:
-                                    listening = True
-                                    mic_feedback = "Starting mic..."
-                                    threading.Thread(target=speech_to_text_worker).start()
-                            elif button.text == "CMD":
-                                # Toggle voice commands
-                                if voice_manager.listening:
-                                    voice_manager.stop_listening()
-                                else:
-                                    voice_manager.start_listening()
-                            else:
-                                letter = button.text.upper() if capitalize else button.text.lower()
-                                text += letter
-                                keyboard.press(letter)
-                                keyboard.release(letter)
-
-                            last_button_press = i
-                            delay = 1
-
-        if delay > 0:
-            delay += 1
-            if delay > 10:
-                delay = 0
+                    if self.last_button_press != i:
+                        if button in prediction_buttons:
+                            if button.text:
+                                prefix = WordPredictor.current_word(self.text.tail(64))
+                                completion = button.text[len(prefix):] + " "
+                                if self.capitalize:
+                                    completion = completion.upper()
+                                self.text.append(completion)
+                                injector.type_text(completion)
+                                if predictor is not None:
+                                    predictor.learn(button.text)
+                        elif button.text == "SP":
+                            if predictor is not None:
+                                predictor.learn(WordPredictor.current_word(self.text.tail(64)))
+                            self.text.append(" ")
+                            injector.tap(' ')
+                        elif button.text == "CL":
+                            if self.text.backspace():
+                                injector.tap('\b')
+                        elif button.text == "APR":
+                            self.capitalize = not self.capitalize
+                        elif button.text == "CLR":
+                            self.text.clear()
+                        elif button.text == "MIC":
+                            if not listening and voice_manager is not None:
+                                listening = True
+                                mic_feedback = "Starting mic..."
+                                threading.Thread(target=speech_to_text_worker).start()
+                        elif button.text == "CMD":
+                            toggle_voice_commands()
+                        else:
+                            letter = button.text.upper() if self.capitalize else button.text.lower()
+                            self.text.append(letter)
+                            injector.tap(letter)
+
+                        self.last_button_press = i
+                        self.delay = 1
+
+        if self.delay > 0:
+            self.delay += 1
+            if self.delay > 10:
+                self.delay = 0
+
+        # Each dictated phrase is typed as one burst rather than a key event per character
+        while not dictation.empty():
+            phrase = " " + dictation.get_nowait()
+            self.text.append(phrase)
+            injector.type_text(phrase)
+
+        self.update_predictions()
+
+        if not drawing:
+            return frame
 
         if mic_feedback:
             cv2.putText(frame, mic_feedback, (450, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
 
-        if transcribed:
-            text += " " + transcribed.pop(0)
-
-        # Display help text in top left
-        y_pos = 100
-        for line in help_text:
-            cv2.putText(frame, line, (20, y_pos), cv2.FONT_HERSHEY_PLAIN, 1, (255, 255, 255), 1)
-            y_pos += 25
-
         # Display voice command status
-        if voice_manager.listening:
-            status_color = (0, 255, 0)  # Green when active
-            cv2.putText(frame, f"Voice: {voice_manager.status_message}", (800, 50), 
-                      cv2.FONT_HERSHEY_PLAIN, 1.5, status_color, 2)
-        else:
-            status_color = (0, 0, 255)  # Red when inactive
-            cv2.putText(frame, "Voice commands disabled", (800, 50), 
-                      cv2.FONT_HERSHEY_PLAIN, 1.5, status_color, 2)
+        draw_voice_status(frame, 800)
 
-        height = 80 if len(text) < 40 else 120
+        height = 80 if len(self.text) < 40 else 120
         cv2.rectangle(frame, (20, 400), (1200, 400 + height), (255, 255, 255), cv2.FILLED)
-        cv2.putText(frame, text[-80:], (30, 400 + height - 20), cv2.FONT_HERSHEY_PLAIN, 3, (0, 0, 0), 3)
-
-        if capitalize:
-            cv2.putText(frame, "CAPS ON", (1050, 50), cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 255), 2)
+        cv2.putText(frame, self.text.tail(80), (30, 400 + height - 20), cv2.FONT_HERSHEY_PLAIN, 3, (0, 0, 0), 3)
 
-        cv2.imshow("Keyboard Control", frame)
+        return frame
 
-        key = cv2.waitKey(1)
+    def on_key(self, key):
         if key == 27:
-            cv2.destroyAllWindows()
-            main_menu()
-            break
+            self.controller.switch_to("menu")
+
+# Mode states live for the whole process, so typed text and caps survive mode switches
+main_menu_state = MainMenu()
+mouse_state = MouseMode()
+keyboard_state = KeyboardMode()
+
+def run_session(initial="menu", headless=False, frame_hook=None, preview=False, pipeline_factory=None):
+    """Run the camera, hand tracking and all modes in one controller loop
+
+    headless skips the preview window, the menu and all drawing; with preview, a few
+    annotated frames a second go to shared memory for shared_preview.py to show (or
+    to preview itself, if it is a publisher object).
+    frame_hook, if given, is called with each TrackedFrame and ends the session by
+    returning False. pipeline_factory replaces the camera pipeline, e.g. with a
+    landmark_trace.ReplayPipeline.
+    """
+    global controller
+
+    def make_pipeline():
+        # Waits for whatever is still loading the first time a camera mode opens
+        startup.get("keyboard")
+        scheduler = None
+        if USE_IDLE_SCHEDULER:
+            scheduler = IdleScheduler(idle_after=IDLE_AFTER_FRAMES, idle_fps=IDLE_FPS,
+                                      detect_every=IDLE_DETECT_EVERY, idle_capture_size=(640, 360))
+        return HandTrackingPipeline(startup.get("camera"), startup.get("hand_tracker"), scheduler)
+
+    publisher = None
+    if headless and preview:
+        publisher = SharedFramePublisher() if preview is True else preview
+    controller = ModeController(pipeline_factory or make_pipeline, headless=headless, show_metrics=SHOW_METRICS_OVERLAY,
+                                preview=publisher)
+    controller.add_state("mouse", mouse_state)
+    controller.add_state("keyboard", keyboard_state)
+    if not headless:
+        controller.add_state("menu", main_menu_state)
+    try:
+        controller.run(initial, frame_hook)
+    finally:
+        controller = None
+        main_menu_state.close()
+        if publisher is not None:
+            publisher.close()
+
+def main_menu(frame_hook=None):
+    run_session("menu", frame_hook=frame_hook)
+
+def mouse_mode(headless=False, frame_hook=None, preview=False):
+    run_session("mouse", headless, frame_hook, preview)
+
+def keyboard_mode(headless=False, frame_hook=None, preview=False):
+    run_session("keyboard", headless, frame_hook, preview)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Control the PC with hand gestures and voice")
+    parser.add_argument("--headless", choices=["mouse", "keyboard"],
+                        help="start straight in this mode with no window and no drawing")
+    parser.add_argument("--preview", action="store_true",
+                        help="with --headless, publish a preview for shared_preview.py to show")
+    parser.add_argument("--record", metavar="TRACE",
+                        help="append the hand landmarks of every frame to this trace file")
+    args = parser.parse_args()
+    recorder = TraceRecorder(args.record) if args.record else None
     try:
-        # Set up callback for voice command mode switching
-        voice_manager.set_mode_switch_callback(switch_mode_callback)
-        main_menu()
+        # Load everything in the background; the menu comes up right away
+        startup.start()
+        if METRICS_DUMP_FILE:
+            metrics.start_dump(METRICS_DUMP_FILE, METRICS_DUMP_INTERVAL)
+        if METRICS_PORT:
+            metrics.serve(METRICS_PORT)
+        if args.headless:
+            run_session(args.headless, headless=True, frame_hook=recorder, preview=args.preview)
+        else:
+            main_menu(recorder)
     finally:
         # Clean up resources
-        if voice_manager.listening:
-            voice_manager.stop_listening()
-        cap.release()
+        if voice_manager is not None:
+            voice_manager.close()
+            audio_hub.stop()
+        if predictor is not None:
+            predictor.save()
+        if recorder is not None:
+            recorder.close()
+        injector.stop()
+        metrics.stop()
+        if cap is not None:
+            cap.release()
         cv2.destroyAllWindows()
\ No newline at end of file
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from stage_metrics import metrics
+
+
+class ActionJob:
+    """One submitted action; state goes queued -> running -> done/failed/timeout, or cancelled"""
+
+    def __init__(self, name, action, kwargs, timeout):
+        self.name = name
+        self.action = action
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.state = "queued"
+        self.error = None
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.timer = None
+
+
+class ActionExecutor:
+    """Runs voice command actions on a small thread pool so the listener never waits on them
+
+    submit() returns straight away. At most max_pending actions may be queued or
+    running at once; further ones are rejected rather than piling up behind a stuck
+    action. The same command with the same arguments submitted again within
+    dedupe_window seconds is dropped, which covers a phrase that fires once from a
+    partial hypothesis and again from the final text.
+
+    An action still running after its timeout is reported through on_error and its
+    late result is ignored. Threads can't be killed, so it keeps its worker until it
+    returns; actions that start processes should pass their own timeout down to
+    them. Its latency is still recorded when it does return, so stats() shows how
+    long overruns really take. Queued actions can be cancelled with cancel_pending().
+    """
+
+    def __init__(self, workers=2, max_pending=8, dedupe_window=1.5, default_timeout=3.0,
+                 on_error=None, history=256):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="voice-action")
+        self.max_pending = max_pending
+        self.dedupe_window = dedupe_window
+        self.default_timeout = default_timeout
+        self.on_error = on_error
+        self.history = history
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.last_submitted = {}
+        self.latencies = {}
+        self.counts = {"submitted": 0, "deduplicated": 0, "rejected": 0, "done": 0, "failed": 0,
+                       "timeout": 0, "cancelled": 0}
+
+    def submit(self, name, action, kwargs=None, timeout=None):
+        """Queue action(**kwargs); returns the ActionJob, or None if deduplicated or rejected"""
+        kwargs = kwargs or {}
+        key = (name, tuple(sorted(kwargs.items())))
+        now = time.perf_counter()
+        with self.lock:
+            last = self.last_submitted.get(key)
+            if last is not None and now - last < self.dedupe_window:
+                self.counts["deduplicated"] += 1
+                return None
+            if len(self.pending) >= self.max_pending:
+                self.counts["rejected"] += 1
+                return None
+            self.last_submitted[key] = now
+            job = ActionJob(name, action, kwargs, timeout or self.default_timeout)
+            self.pending.add(job)
+            self.counts["submitted"] += 1
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        with self.lock:
+            if job.state != "queued":
+                return
+            job.state = "running"
+        job.started_at = time.perf_counter()
+        metrics.record("command_wait", job.started_at - job.submitted_at)
+        job.timer = threading.Timer(job.timeout, self._expire, (job,))
+        job.timer.daemon = True
+        job.timer.start()
+        try:
+            job.action(**job.kwargs)
+            error = None
+        except Exception as e:
+            error = e
+        job.timer.cancel()
+        elapsed = time.perf_counter() - job.started_at
+        # Recorded here rather than in _finish, so an action that timed out still
+        # contributes its real run time once it returns
+        with self.lock:
+            self.latencies.setdefault(job.name, deque(maxlen=self.history)).append(elapsed)
+        metrics.record("command_action", elapsed)
+        self._finish(job, "failed" if error else "done", error)
+
+    def _expire(self, job):
+        self._finish(job, "timeout", TimeoutError(f"{job.name} took longer than {job.timeout:.1f} s"))
+
+    def _finish(self, job, state, error=None):
+        with self.lock:
+            # Whichever of completion, timeout and cancellation comes first decides the outcome
+            if job.state not in ("queued", "running"):
+                return False
+            job.state = state
+            job.error = error
+            job.finished_at = time.perf_counter()
+            self.pending.discard(job)
+            self.counts[state] += 1
+        if error is not None and self.on_error:
+            self.on_error(job.name, error)
+        return True
+
+    def cancel_pending(self):
+        """Cancel every action that hasn't started yet; returns how many were cancelled"""
+        with self.lock:
+            queued = [job for job in self.pending if job.state == "queued"]
+        cancelled = 0
+        for job in queued:
+            job.future.cancel()
+            cancelled += self._finish(job, "cancelled")
+        return cancelled
+
+    def wait(self, timeout=None):
+        """Wait until nothing is queued or running; False on timeout"""
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        while True:
+            with self.lock:
+                if not self.pending:
+                    return True
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            time.sleep(0.01)
+
+    def stats(self):
+        """Outcome counters plus per-command latency percentiles in milliseconds"""
+        with self.lock:
+            snapshot = {name: list(values) for name, values in self.latencies.items()}
+            stats = dict(self.counts)
+            stats["pending"] = len(self.pending)
+        stats["actions"] = {}
+        for name, values in snapshot.items():
+            p50, p95 = np.percentile(np.array(values) * 1000, [50, 95])
+            stats["actions"][name] = {"count": len(values), "p50_ms": round(float(p50), 2),
+                                      "p95_ms": round(float(p95), 2), "max_ms": round(max(values) * 1000, 2)}
+        return stats
+
+    def shutdown(self):
+        self.cancel_pending()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,257 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import speech_recognition as sr
+
+from stage_metrics import metrics
+
+
+class AudioRingBuffer:
+    """Fixed-size byte ring holding the last few seconds of microphone audio
+
+    Positions are absolute byte offsets since capture started, so a segment can be
+    cut out later as long as it hasn't been overwritten yet.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = bytearray(capacity)
+        self.written = 0
+        self.lock = threading.Lock()
+
+    def write(self, chunk):
+        with self.lock:
+            chunk = chunk[-self.capacity:]
+            start = self.written % self.capacity
+            first = min(len(chunk), self.capacity - start)
+            self.data[start:start + first] = chunk[:first]
+            self.data[:len(chunk) - first] = chunk[first:]
+            self.written += len(chunk)
+
+    def read(self, begin, end):
+        """Bytes between two absolute positions, clipped to what is still buffered"""
+        with self.lock:
+            begin = max(begin, self.written - self.capacity, 0)
+            end = min(end, self.written)
+            if end <= begin:
+                return b""
+            start = begin % self.capacity
+            length = end - begin
+            if start + length <= self.capacity:
+                return bytes(self.data[start:start + length])
+            return bytes(self.data[start:]) + bytes(self.data[:length - (self.capacity - start)])
+
+
+class EnergyVAD:
+    """Energy-based voice activity detector working on fixed-size 16-bit chunks
+
+    A chunk counts as speech when its RMS exceeds noise_floor * ratio (and at least
+    min_threshold). An utterance starts after start_ms of speech, ends after
+    hangover_ms of silence or at max_utterance_s, and includes pre_roll_ms of audio
+    before the detected start so word onsets aren't clipped.
+
+    Without a starting noise_floor the first calibration_ms of audio is used to
+    measure one. Afterwards the floor keeps following the background level: every
+    silent chunk moves it by the fraction adapt_rate. A starting floor that is too
+    low for the room (e.g. a saved one) makes every chunk look voiced. Speech rises
+    and falls with its syllables, while background hum stays level, so an
+    "utterance" that reaches max_utterance_s with chunk levels varying by less than
+    steady_variation (standard deviation over mean) is taken as background: it is
+    dropped and the floor moves to its 10th percentile level. Anything less steady
+    is returned as speech.
+    """
+
+    def __init__(self, sample_rate, sample_width=2, ratio=2.5, min_threshold=150,
+                 start_ms=90, hangover_ms=500, pre_roll_ms=300, max_utterance_s=6.0,
+                 calibration_ms=500, noise_floor=None, adapt_rate=0.02, steady_variation=0.25):
+        self.sample_width = sample_width
+        self.bytes_per_second = sample_rate * sample_width
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.start_bytes = self._ms(start_ms)
+        self.hangover_bytes = self._ms(hangover_ms)
+        self.pre_roll_bytes = self._ms(pre_roll_ms)
+        self.max_bytes = self._ms(max_utterance_s * 1000)
+        self.calibration_bytes = self._ms(calibration_ms)
+        self.adapt_rate = adapt_rate
+        self.steady_variation = steady_variation
+
+        self.noise_floor = noise_floor
+        self.calibration = []
+        self.calibrated_bytes = 0
+        self.speech_start = None
+        self.voiced_bytes = 0
+        self.last_voice = 0
+        # Per-chunk levels of the utterance in progress
+        self.levels = []
+
+    def _ms(self, ms):
+        # Keep every offset on a sample boundary
+        return int(self.bytes_per_second * ms / 1000) // self.sample_width * self.sample_width
+
+    @property
+    def threshold(self):
+        return max((self.noise_floor or 0) * self.ratio, self.min_threshold)
+
+    def _steady(self):
+        levels = np.array(self.levels)
+        mean = levels.mean()
+        return mean > 0 and levels.std() / mean < self.steady_variation
+
+    def process(self, chunk, position):
+        """Feed one chunk ending at absolute byte position; returns (begin, end) when an utterance ends"""
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+        rms = float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+        # Noise floor from the first moments of capture, instead of a blocking calibration step
+        if self.noise_floor is None:
+            self.calibration.append(rms)
+            self.calibrated_bytes += len(chunk)
+            if self.calibrated_bytes >= self.calibration_bytes:
+                self.noise_floor = float(np.median(self.calibration))
+            return None
+
+        voiced = rms > self.threshold
+
+        if self.speech_start is None:
+            if voiced:
+                self.voiced_bytes += len(chunk)
+                if self.voiced_bytes >= self.start_bytes:
+                    self.speech_start = max(position - self.voiced_bytes - self.pre_roll_bytes, 0)
+                    self.last_voice = position
+                    self.levels = []
+            else:
+                self.voiced_bytes = 0
+                self.noise_floor += self.adapt_rate * (rms - self.noise_floor)
+            return None
+
+        self.levels.append(rms)
+        if voiced:
+            self.last_voice = position
+        too_long = position - self.speech_start >= self.max_bytes
+        if too_long and self._steady():
+            # A level hum that never stops is background noise above a stale floor
+            self.noise_floor = float(np.percentile(self.levels, 10))
+            self.speech_start = None
+            self.voiced_bytes = 0
+            return None
+        if position - self.last_voice >= self.hangover_bytes or too_long:
+            # Keep a little audio after the last voiced chunk for trailing consonants
+            end = position if voiced else min(self.last_voice + self.hangover_bytes // 2, position)
+            segment = (self.speech_start, end)
+            self.speech_start = None
+            self.voiced_bytes = 0
+            return segment
+        return None
+
+
+class RecognitionPool:
+    """Transcribes utterances on worker threads and delivers results in utterance order"""
+
+    def __init__(self, backend, on_result, on_error=None, workers=2):
+        self.backend = backend
+        self.on_result = on_result
+        self.on_error = on_error
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recognizer")
+        self.lock = threading.Lock()
+        self.next_seq = 0
+        self.deliver_seq = 0
+        self.pending = {}
+
+    def submit(self, audio):
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+        self.executor.submit(self._recognize, seq, audio)
+
+    def _recognize(self, seq, audio):
+        started = time.time()
+        try:
+            outcome = ("text", self.backend.transcribe(audio), time.time() - started)
+        except Exception as e:
+            outcome = ("error", e, time.time() - started)
+        metrics.record("recognition", outcome[2])
+
+        # Hold results back until every earlier utterance has been delivered
+        with self.lock:
+            self.pending[seq] = outcome
+            ready = []
+            while self.deliver_seq in self.pending:
+                ready.append(self.pending.pop(self.deliver_seq))
+                self.deliver_seq += 1
+            for kind, value, elapsed in ready:
+                if kind == "text":
+                    self.on_result(value, elapsed)
+                elif self.on_error:
+                    self.on_error(value)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AudioCapture:
+    """Always-on microphone capture into a ring buffer, cut into utterances by an EnergyVAD
+
+    The capture thread never waits on recognition: finished utterances are handed to
+    on_utterance (typically RecognitionPool.submit) as sr.AudioData and capture
+    carries straight on, so speech right after a command is still recorded.
+    """
+
+    def __init__(self, on_utterance, on_chunk=None, source_factory=sr.Microphone, buffer_seconds=20,
+                 **vad_options):
+        self.on_utterance = on_utterance
+        self.on_chunk = on_chunk
+        self.source_factory = source_factory
+        self.buffer_seconds = buffer_seconds
+        self.vad_options = vad_options
+        self.buffer = None
+        self.vad = None
+        self.running = False
+        self.thread = None
+        self.error = None
+        self.ready = threading.Event()
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.error = None
+            self.ready.clear()
+            self.thread = threading.Thread(target=self._capture_loop)
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+            self.thread = None
+
+    def _capture_loop(self):
+        try:
+            with self.source_factory() as source:
+                self.sample_rate = source.SAMPLE_RATE
+                self.sample_width = source.SAMPLE_WIDTH
+                self.buffer = AudioRingBuffer(self.buffer_seconds * self.sample_rate * self.sample_width)
+                self.vad = EnergyVAD(self.sample_rate, self.sample_width, **self.vad_options)
+                self.ready.set()
+
+                while self.running:
+                    with metrics.time("audio_read"):
+                        chunk = source.stream.read(source.CHUNK)
+                    started = time.perf_counter()
+                    self.buffer.write(chunk)
+                    if self.on_chunk:
+                        self.on_chunk(chunk)
+                    segment = self.vad.process(chunk, self.buffer.written)
+                    metrics.record("audio_vad", time.perf_counter() - started)
+                    if segment:
+                        data = self.buffer.read(*segment)
+                        self.on_utterance(sr.AudioData(data, self.sample_rate, self.sample_width))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.running = False
+            self.ready.set()
@@ -0,0 +1,172 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from audio_capture import AudioCapture
+
+DEFAULT_CALIBRATION_FILE = os.path.join(os.path.expanduser("~"), ".gesturevoice_noise.json")
+
+
+class AudioSubscription:
+    """Queue of chunks or utterances delivered by an AudioHub; close() to unsubscribe"""
+
+    def __init__(self, hub, kind, maxsize):
+        self.hub = hub
+        self.kind = kind
+        self.queue = queue.Queue(maxsize)
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # A stalled reader loses the oldest audio rather than holding up capture
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(item)
+
+    def get(self, timeout=None):
+        """Next item, or None after timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AudioHub:
+    """Owns the one microphone shared by voice commands and dictation
+
+    Capture runs continuously once started, so the VAD's noise floor keeps tracking
+    the room in the background. The floor is saved to calibration_file now and then
+    and loaded on the next start, so listening never begins with a calibration pause.
+
+    Consumers either subscribe() for a queue of raw chunks ("chunk", for streaming
+    recognizers) or finished utterances ("utterance", sr.AudioData), or add_listener()
+    for a callback run on the capture thread, which must return quickly.
+    """
+
+    def __init__(self, calibration_file=DEFAULT_CALIBRATION_FILE, save_interval=30, **capture_options):
+        self.calibration_file = calibration_file
+        self.save_interval = save_interval
+        self.capture_options = capture_options
+        self.capture = None
+        self.subscriptions = []
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.last_save = 0
+
+    @property
+    def running(self):
+        return self.capture is not None and self.capture.running
+
+    @property
+    def sample_rate(self):
+        return self.capture.sample_rate if self.capture else None
+
+    @property
+    def noise_floor(self):
+        vad = self.capture.vad if self.capture else None
+        return vad.noise_floor if vad else None
+
+    def start(self, timeout=2.0):
+        """Open the microphone if it isn't already; returns once audio is flowing"""
+        with self.lock:
+            if not self.running:
+                self.capture = AudioCapture(self._publish_utterance, on_chunk=self._publish_chunk,
+                                            noise_floor=self._load_noise_floor(), **self.capture_options)
+                self.capture.start()
+        self.capture.ready.wait(timeout)
+        if self.capture.error:
+            raise self.capture.error
+        return self
+
+    def start_background(self):
+        """Open the microphone without waiting, so calibration is warm before anyone listens"""
+        def run():
+            try:
+                self.start()
+            except Exception as e:
+                print(f"Audio hub could not start: {e}")
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self):
+        with self.lock:
+            capture, self.capture = self.capture, None
+        if capture:
+            capture.stop()
+            if capture.vad and capture.vad.noise_floor is not None:
+                self._save_noise_floor(capture.vad.noise_floor)
+
+    def subscribe(self, kind, maxsize=256):
+        if kind not in ("chunk", "utterance"):
+            raise ValueError(f"Unknown subscription kind: {kind}")
+        subscription = AudioSubscription(self, kind, maxsize)
+        with self.lock:
+            self.subscriptions = self.subscriptions + [subscription]
+        self.start()
+        return subscription
+
+    def add_listener(self, callback):
+        """Call callback(audio) on the capture thread for every finished utterance"""
+        with self.lock:
+            self.listeners = self.listeners + [callback]
+        self.start()
+
+    def remove_listener(self, callback):
+        with self.lock:
+            self.listeners = [c for c in self.listeners if c is not callback]
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+
+    def next_utterance(self, timeout=6):
+        """Wait for the next complete utterance, e.g. for one round of dictation"""
+        with self.subscribe("utterance", maxsize=4) as subscription:
+            return subscription.get(timeout)
+
+    def _publish_chunk(self, chunk):
+        # Lists are replaced, never mutated, so the capture thread can read them without the lock
+        for subscription in self.subscriptions:
+            if subscription.kind == "chunk":
+                subscription.put(chunk)
+
+        now = time.time()
+        if now - self.last_save > self.save_interval and self.noise_floor is not None:
+            self.last_save = now
+            self._save_noise_floor(self.noise_floor)
+
+    def _publish_utterance(self, audio):
+        for subscription in self.subscriptions:
+            if subscription.kind == "utterance":
+                subscription.put(audio)
+        for callback in self.listeners:
+            callback(audio)
+
+    def _load_noise_floor(self):
+        try:
+            with open(self.calibration_file) as f:
+                return float(json.load(f)["noise_floor"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_noise_floor(self, noise_floor):
+        if not self.calibration_file:
+            return
+        try:
+            with open(self.calibration_file, "w") as f:
+                json.dump({"noise_floor": noise_floor, "saved_at": time.time()}, f)
+        except OSError:
+            pass
@@ -0,0 +1,338 @@
+"""Offline benchmark for the gesture loops
+
+Runs mouse_mode() or keyboard_mode() headless against a video file or a
+synthetic frame source, with recording stand-ins for pyautogui and pynput, and
+reports throughput, frame-time percentiles and the input events emitted.
+--allocations adds how much memory the whole pipeline allocates per frame.
+With --trace, a recorded landmark trace (see landmark_trace.py) is fed straight
+into the mode without camera or hand model, as fast as the mode can take it;
+--events saves the emitted input events for comparing runs.
+
+    python benchmark.py --mode mouse --video recordings/session.mp4
+    python benchmark.py --mode keyboard --synthetic 600 --json results.json
+    python benchmark.py --mode mouse --trace session.trace --events mouse_events.json
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+import types
+
+import cv2
+import numpy as np
+
+
+class RecordingPyAutoGUI(types.ModuleType):
+    """Stand-in for the pyautogui module that records calls instead of moving the mouse"""
+
+    def __init__(self, screen_size=(1920, 1080)):
+        super().__init__("pyautogui")
+        self.screen_size = screen_size
+        self.PAUSE = 0
+        self.FAILSAFE = False
+        self.events = []
+
+    def size(self):
+        return self.screen_size
+
+    def moveTo(self, x, y, *args, **kwargs):
+        self.events.append(("move", x, y))
+
+    def click(self, *args, button="left", **kwargs):
+        self.events.append(("click", button))
+
+    def scroll(self, clicks, *args, **kwargs):
+        self.events.append(("scroll", clicks))
+
+    def press(self, key, *args, **kwargs):
+        self.events.append(("press", key))
+
+    def hotkey(self, *keys, **kwargs):
+        self.events.append(("hotkey",) + keys)
+
+    def screenshot(self, *args, **kwargs):
+        self.events.append(("screenshot",))
+
+    def count(self, kind):
+        return sum(1 for event in self.events if event[0] == kind)
+
+
+class RecordingKeyboard:
+    """Stand-in for pynput.keyboard.Controller"""
+
+    events = []
+
+    def press(self, key):
+        self.events.append(("press", key))
+
+    def release(self, key):
+        self.events.append(("release", key))
+
+    def type(self, text):
+        for char in text:
+            self.press(char)
+            self.release(char)
+
+
+def install_stand_ins(screen_size=(1920, 1080)):
+    """Register the recording stand-ins so importing MouseKeyborad needs no display"""
+    gui = RecordingPyAutoGUI(screen_size)
+    pynput = types.ModuleType("pynput")
+    pynput_keyboard = types.ModuleType("pynput.keyboard")
+    pynput_keyboard.Controller = RecordingKeyboard
+    pynput.keyboard = pynput_keyboard
+
+    sys.modules["pyautogui"] = gui
+    sys.modules["pynput"] = pynput
+    sys.modules["pynput.keyboard"] = pynput_keyboard
+    return gui
+
+
+class VideoFileSource:
+    """cv2.VideoCapture look-alike that plays a file, paced like a live camera by default"""
+
+    def __init__(self, path, realtime=True, max_frames=None):
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open video: {path}")
+        fps = self.capture.get(cv2.CAP_PROP_FPS) or 30
+        self.interval = 1.0 / fps if realtime else 0
+        self.max_frames = max_frames
+        self.frames_read = 0
+        self.next_time = None
+
+    def read(self, image=None):
+        if self.max_frames is not None and self.frames_read >= self.max_frames:
+            return False, None
+        _pace(self)
+        success, frame = self.capture.read(image)
+        if success:
+            self.frames_read += 1
+        return success, frame
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.capture.release()
+
+
+class SyntheticFrameSource:
+    """Generates noise frames with a moving bright patch, for runs without any recording"""
+
+    def __init__(self, frames, width=1280, height=720, fps=30):
+        self.max_frames = frames
+        self.width = width
+        self.height = height
+        self.interval = 1.0 / fps if fps else 0
+        self.frames_read = 0
+        self.next_time = None
+        rng = np.random.default_rng(0)
+        self.background = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+
+    def read(self, image=None):
+        if self.frames_read >= self.max_frames:
+            return False, None
+        _pace(self)
+        # Like cv2.VideoCapture.read, fill the caller's buffer when it has the right shape
+        if image is not None and image.shape == self.background.shape:
+            frame = image
+            np.copyto(frame, self.background)
+        else:
+            frame = self.background.copy()
+        x = int((self.frames_read * 7) % (self.width - 200))
+        y = int(self.height / 2 + (self.height / 4) * np.sin(self.frames_read / 15))
+        cv2.circle(frame, (x + 100, y), 60, (180, 200, 230), cv2.FILLED)
+        self.frames_read += 1
+        return True, frame
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        pass
+
+
+def _pace(source):
+    # Sleep until the next frame is due so the grabber sees camera-like timing
+    if not source.interval:
+        return
+    now = time.perf_counter()
+    if source.next_time is None:
+        source.next_time = now
+    elif source.next_time > now:
+        time.sleep(source.next_time - now)
+    source.next_time += source.interval
+
+
+class DrawEveryFrame:
+    """Preview stand-in that makes a headless run draw every frame and then discards it"""
+
+    def due(self):
+        return True
+
+    def publish(self, frame):
+        pass
+
+    def close(self):
+        pass
+
+
+class FrameRecorder:
+    """frame_hook that timestamps every rendered frame
+
+    With track_allocations, tracemalloc (which sees numpy and OpenCV arrays) records
+    the peak memory allocated above the baseline between consecutive frames, on all
+    threads. A pipeline that reuses its buffers stays near zero.
+    """
+
+    def __init__(self, warmup=10, track_allocations=False):
+        self.warmup = warmup
+        self.track_allocations = track_allocations
+        self.seen = 0
+        self.render_times = []
+        self.latencies = []
+        self.allocations = []
+        self.last_seq = 0
+        self.baseline = 0
+
+    def __call__(self, tracked):
+        self.seen += 1
+        self.last_seq = tracked.seq
+        if self.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.seen > self.warmup:
+                self.allocations.append(max(peak - self.baseline, 0))
+            self.baseline = current
+            tracemalloc.reset_peak()
+        if self.seen <= self.warmup:
+            return True
+        now = time.perf_counter()
+        self.render_times.append(now)
+        # captured_at/processed_at come from time.time() (or the recorded times on replay);
+        # latency is a difference so that is fine
+        self.latencies.append(tracked.clock() - tracked.captured_at)
+        return True
+
+
+def _percentiles(values_ms):
+    if len(values_ms) == 0:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values_ms, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)}
+
+
+def summarize(recorder, gui, elapsed):
+    frame_times = np.diff(recorder.render_times) * 1000 if len(recorder.render_times) > 1 else []
+    measured = len(recorder.render_times)
+    keyboard_events = RecordingKeyboard.events
+    return {
+        "frames_rendered": recorder.seen,
+        "frames_captured": recorder.last_seq,
+        "frames_dropped": max(recorder.last_seq - recorder.seen, 0),
+        "elapsed_s": round(elapsed, 3),
+        "fps": round((measured - 1) / (recorder.render_times[-1] - recorder.render_times[0]), 2)
+               if measured > 1 and recorder.render_times[-1] > recorder.render_times[0] else 0.0,
+        "frame_time_ms": _percentiles(frame_times),
+        "latency_ms": _percentiles(np.array(recorder.latencies) * 1000),
+        "moves": gui.count("move"),
+        "clicks": gui.count("click"),
+        "keys": sum(1 for event in keyboard_events if event[0] == "press"),
+    }
+
+
+def run(mode, source, warmup=10, idle=False, draw=False, allocations=False, trace=None):
+    gui = install_stand_ins()
+    import MouseKeyborad
+
+    # Sources without a hand in them would otherwise measure the idle frame rate
+    MouseKeyborad.USE_IDLE_SCHEDULER = idle
+
+    pipeline_factory = None
+    if trace is not None:
+        from landmark_trace import ReplayPipeline
+        pipeline_factory = lambda: ReplayPipeline(trace)
+    else:
+        # Use the benchmark source instead of opening the default camera, and load the
+        # hand model before timing starts
+        MouseKeyborad.startup.provide("camera", source)
+        MouseKeyborad.startup.get("hand_tracker")
+    MouseKeyborad.startup.get("keyboard")
+    RecordingKeyboard.events.clear()
+    MouseKeyborad.metrics.reset()
+    recorder = FrameRecorder(warmup=warmup, track_allocations=allocations)
+
+    if allocations:
+        tracemalloc.start()
+    start = time.perf_counter()
+    MouseKeyborad.run_session(mode, headless=True, frame_hook=recorder, preview=DrawEveryFrame() if draw else False,
+                              pipeline_factory=pipeline_factory)
+    MouseKeyborad.injector.flush(timeout=2)
+    elapsed = time.perf_counter() - start
+    if allocations:
+        tracemalloc.stop()
+    if source is not None:
+        source.release()
+
+    report = summarize(recorder, gui, elapsed)
+    if allocations:
+        report["alloc_kb_per_frame"] = _percentiles(np.array(recorder.allocations) / 1024)
+    report["injection"] = MouseKeyborad.injector.latency_stats()
+    report["stages_ms"] = MouseKeyborad.metrics.snapshot()
+    report["events"] = gui.events + RecordingKeyboard.events
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the gesture loops without a camera or display")
+    parser.add_argument("--mode", choices=["mouse", "keyboard"], default="mouse")
+    parser.add_argument("--video", help="video file to play instead of the webcam")
+    parser.add_argument("--trace", help="landmark trace to replay instead of running the hand model")
+    parser.add_argument("--synthetic", type=int, default=300, metavar="FRAMES",
+                        help="number of synthetic frames when no --video is given")
+    parser.add_argument("--fps", type=float, default=30, help="source frame rate, 0 for as fast as possible")
+    parser.add_argument("--max-frames", type=int, help="stop the video after this many frames")
+    parser.add_argument("--warmup", type=int, default=10, help="rendered frames to ignore at the start")
+    parser.add_argument("--idle", action="store_true",
+                        help="keep the idle scheduler on (throttles while no hand is in view)")
+    parser.add_argument("--draw", action="store_true", help="draw overlays every frame as if a window were open")
+    parser.add_argument("--allocations", action="store_true",
+                        help="measure memory allocated per frame with tracemalloc (slows the run down)")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--events", help="write the emitted mouse and key events to this JSON file")
+    parser.add_argument("--min-fps", type=float, help="exit with status 1 if throughput is below this")
+    args = parser.parse_args(argv)
+
+    trace = None
+    source = None
+    if args.trace:
+        from landmark_trace import open_trace
+        trace = open_trace(args.trace)
+    elif args.video:
+        source = VideoFileSource(args.video, realtime=args.fps > 0, max_frames=args.max_frames)
+    else:
+        source = SyntheticFrameSource(args.synthetic, fps=args.fps)
+
+    report = run(args.mode, source, warmup=args.warmup, idle=args.idle, draw=args.draw,
+                 allocations=args.allocations, trace=trace)
+    report["mode"] = args.mode
+    report["source"] = args.trace or args.video or f"synthetic:{args.synthetic}"
+    events = report.pop("events")
+    if args.events:
+        with open(args.events, "w") as f:
+            json.dump([list(event) for event in events], f)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.min_fps is not None and report["fps"] < args.min_fps:
+        print(f"Throughput {report['fps']} fps is below the {args.min_fps} fps floor")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
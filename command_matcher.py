@@ -0,0 +1,204 @@
+import difflib
+import re
+from collections import deque
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+SLOT_RE = re.compile(r"^\{(\w+)\}$")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def soundex(word):
+    """Classic 4-character Soundex key, so words that sound alike compare equal"""
+    codes = {c: d for d, letters in {"1": "bfpv", "2": "cgjkqsxz", "3": "dt",
+                                     "4": "l", "5": "mn", "6": "r"}.items() for c in letters}
+    word = word.lower()
+    if not word:
+        return ""
+    key = word[0]
+    last = codes.get(word[0], "")
+    for c in word[1:]:
+        code = codes.get(c, "")
+        if code and code != last:
+            key += code
+        if c not in "hw":
+            last = code
+    return (key + "000")[:4]
+
+
+class CommandMatch:
+    """The single command picked for an utterance"""
+
+    def __init__(self, command, action, slots, start, end, substitutions, priority=0):
+        self.command = command
+        self.action = action
+        self.priority = priority
+        self.slots = slots
+        self.start = start
+        self.end = end
+        self.substitutions = substitutions
+
+    def __repr__(self):
+        return f"CommandMatch({self.command!r}, slots={self.slots})"
+
+
+class _Pattern:
+    def __init__(self, command, action, priority):
+        self.command = command
+        self.action = action
+        self.priority = priority
+        self.items = []
+        for token in command.lower().split():
+            slot = SLOT_RE.match(token)
+            self.items.append(("slot", slot.group(1)) if slot else ("word", token))
+        if not self.items or self.items[0][0] != "word":
+            raise ValueError(f"Command must start with a word: {command!r}")
+        # Leading words go through the automaton; whatever follows is checked per hit
+        self.anchor_len = next((i for i, (kind, _) in enumerate(self.items) if kind == "slot"), len(self.items))
+        self.anchor = [value for _, value in self.items[:self.anchor_len]]
+        self.has_slots = self.anchor_len < len(self.items)
+
+    def match_rest(self, tokens, keys, pos, key):
+        """Match the items after the anchor starting at token pos; returns (slots, end) or None"""
+        slots = {}
+        items = self.items[self.anchor_len:]
+        i = 0
+        while i < len(items):
+            kind, value = items[i]
+            if kind == "word":
+                if pos >= len(tokens) or keys[pos] != key(value):
+                    return None
+                pos += 1
+                i += 1
+                continue
+            # Slot: runs up to the next literal word of the pattern, or to the end of the text
+            following = items[i + 1][1] if i + 1 < len(items) else None
+            end = len(tokens)
+            if following is not None:
+                end = next((j for j in range(pos + 1, len(tokens)) if keys[j] == key(following)), None)
+                if end is None:
+                    return None
+            if end <= pos:
+                return None
+            slots[value] = " ".join(tokens[pos:end])
+            pos = end
+            i += 1
+        return slots, pos
+
+
+class CommandMatcher:
+    """Word-level Aho-Corasick index over voice command phrases
+
+    Commands are phrases such as "scroll down" or "search for {query}"; {name}
+    marks a slot that captures the spoken words in its place and is passed to the
+    action as a keyword argument. All phrases are compiled into one automaton, so
+    finding every candidate in an utterance costs one pass over its words no matter
+    how many commands are registered.
+
+    tolerance is "exact", "fuzzy" (unknown words are snapped to the closest command
+    word) or "phonetic" (words are compared by Soundex key). match() resolves the
+    candidates to one command: fewest fuzzy substitutions, then the longest phrase,
+    then the highest priority, then the earliest in the utterance.
+    """
+
+    def __init__(self, tolerance="exact", fuzzy_cutoff=0.8):
+        if tolerance not in ("exact", "fuzzy", "phonetic"):
+            raise ValueError(f"Unknown tolerance: {tolerance}")
+        self.tolerance = tolerance
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.patterns = []
+        self.compiled = False
+
+    def add(self, command, action, priority=0):
+        self.patterns.append(_Pattern(command, action, priority))
+        self.compiled = False
+
+    def remove(self, command):
+        self.patterns = [p for p in self.patterns if p.command != command]
+        self.compiled = False
+
+    def _key(self, word):
+        return soundex(word) if self.tolerance == "phonetic" else word
+
+    def compile(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.vocabulary = set()
+
+        for pattern in self.patterns:
+            self.vocabulary.update(value for kind, value in pattern.items if kind == "word")
+            node = 0
+            for word in pattern.anchor:
+                key = self._key(word)
+                if key not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][key] = len(self.goto) - 1
+                node = self.goto[node][key]
+            self.output[node].append(pattern)
+
+        # Breadth-first pass to fill in failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for key, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and key not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(key, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+        self.snap_cache = {}
+        self.compiled = True
+
+    def _snap(self, word):
+        if word in self.vocabulary:
+            return word, False
+        if word not in self.snap_cache:
+            close = difflib.get_close_matches(word, self.vocabulary, n=1, cutoff=self.fuzzy_cutoff)
+            self.snap_cache[word] = (close[0], True) if close else (word, False)
+        return self.snap_cache[word]
+
+    def find_all(self, text, allow_slots=True):
+        """Every command that occurs in text, in no particular order"""
+        if not self.compiled:
+            self.compile()
+
+        words = tokenize(text)
+        tokens = list(words)
+        substituted = [False] * len(tokens)
+        if self.tolerance == "fuzzy":
+            for i, word in enumerate(words):
+                tokens[i], substituted[i] = self._snap(word)
+        keys = [self._key(word) for word in tokens]
+
+        found = []
+        node = 0
+        for i, key in enumerate(keys):
+            while node and key not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(key, 0)
+            for pattern in self.output[node]:
+                if pattern.has_slots and not allow_slots:
+                    continue
+                start = i - pattern.anchor_len + 1
+                # Slots capture what was actually said, not the snapped words
+                rest = pattern.match_rest(words, keys, i + 1, self._key)
+                if rest is None:
+                    continue
+                slots, end = rest
+                found.append(CommandMatch(pattern.command, pattern.action, slots, start, end,
+                                          sum(substituted[start:end]), pattern.priority))
+        return found
+
+    def match(self, text, allow_slots=True):
+        """The single best command in text, or None"""
+        found = self.find_all(text, allow_slots)
+        if not found:
+            return None
+        return min(found, key=lambda m: (m.substitutions, -(m.end - m.start), -m.priority, m.start))
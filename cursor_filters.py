@@ -0,0 +1,143 @@
+import json
+import math
+import os
+
+
+class ExponentialFilter:
+    """The original fixed smoothing: move 1/smoothening of the way to the target each frame"""
+
+    def __init__(self, smoothening=5):
+        self.smoothening = smoothening
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.y = None
+
+    def __call__(self, x, y, t, latency=0.0):
+        if self.x is None:
+            self.x, self.y = x, y
+        else:
+            self.x += (x - self.x) / self.smoothening
+            self.y += (y - self.y) / self.smoothening
+        return self.x, self.y
+
+
+def _alpha(cutoff, dt):
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """Speed-adaptive low-pass filter (Casiez et al., "1 Euro Filter")
+
+    The cutoff frequency rises with the cursor's speed: a still hand gets heavy
+    smoothing (min_cutoff, in Hz) and a fast move gets little, so jitter is removed
+    without adding lag to quick gestures. beta sets how fast the cutoff rises.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.t = None
+        self.x = self.y = 0.0
+        self.dx = self.dy = 0.0
+
+    def __call__(self, x, y, t, latency=0.0):
+        if self.t is None:
+            self.t = t
+            self.x, self.y = x, y
+            return self.x, self.y
+        if t <= self.t:
+            return self.x, self.y
+
+        dt = t - self.t
+        self.t = t
+
+        a_d = _alpha(self.d_cutoff, dt)
+        self.dx += a_d * ((x - self.x) / dt - self.dx)
+        self.dy += a_d * ((y - self.y) / dt - self.dy)
+
+        speed = math.hypot(self.dx, self.dy)
+        a = _alpha(self.min_cutoff + self.beta * speed, dt)
+        self.x += a * (x - self.x)
+        self.y += a * (y - self.y)
+        return self.x, self.y
+
+    @property
+    def velocity(self):
+        return self.dx, self.dy
+
+
+class PredictiveFilter:
+    """Wraps a filter and projects its output forward at constant velocity
+
+    The lead time is the measured pipeline latency passed in by the caller (capture
+    to injection), or lead_s when no measurement is given, capped at max_lead_s.
+    Velocity is estimated from the filtered output and smoothed with the same
+    exponential factor as a One-Euro derivative so noise isn't amplified.
+    """
+
+    def __init__(self, base, lead_s=None, max_lead_s=0.12, velocity_cutoff=4.0):
+        self.base = base
+        self.lead_s = lead_s
+        self.max_lead_s = max_lead_s
+        self.velocity_cutoff = velocity_cutoff
+        self.reset()
+
+    def reset(self):
+        self.base.reset()
+        self.t = None
+        self.px = self.py = 0.0
+        self.vx = self.vy = 0.0
+
+    def __call__(self, x, y, t, latency=0.0):
+        fx, fy = self.base(x, y, t, latency)
+        if self.t is not None and t > self.t:
+            dt = t - self.t
+            a = _alpha(self.velocity_cutoff, dt)
+            self.vx += a * ((fx - self.px) / dt - self.vx)
+            self.vy += a * ((fy - self.py) / dt - self.vy)
+        self.t, self.px, self.py = t, fx, fy
+
+        lead = self.lead_s if self.lead_s is not None else latency
+        lead = min(max(lead, 0.0), self.max_lead_s)
+        return fx + self.vx * lead, fy + self.vy * lead
+
+
+DEFAULT_FILTER_CONFIG = {
+    "type": "one_euro",
+    "min_cutoff": 1.0,
+    "beta": 0.01,
+    "d_cutoff": 1.0,
+    "predict": True,
+    "max_lead_s": 0.08,
+}
+
+
+def make_cursor_filter(config=None):
+    """Build a filter from a config dict; see DEFAULT_FILTER_CONFIG for the keys"""
+    config = dict(DEFAULT_FILTER_CONFIG, **(config or {}))
+    if config["type"] == "exponential":
+        cursor_filter = ExponentialFilter(config.get("smoothening", 5))
+    elif config["type"] == "one_euro":
+        cursor_filter = OneEuroFilter(config["min_cutoff"], config["beta"], config["d_cutoff"])
+    else:
+        raise ValueError(f"Unknown cursor filter type: {config['type']}")
+
+    if config.get("predict"):
+        cursor_filter = PredictiveFilter(cursor_filter, lead_s=config.get("lead_s"),
+                                         max_lead_s=config["max_lead_s"])
+    return cursor_filter
+
+
+def load_filter_config(path):
+    """Read per-deployment filter settings from a JSON file, falling back to the defaults"""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return dict(DEFAULT_FILTER_CONFIG, **json.load(f))
+    return dict(DEFAULT_FILTER_CONFIG)
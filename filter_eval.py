@@ -0,0 +1,109 @@
+"""Score cursor filters for lag and jitter on recorded traces
+
+A trace is a CSV with a t,x,y header: timestamps in seconds and the raw
+(unfiltered) cursor target in screen pixels, one row per tracked frame.
+
+    python filter_eval.py traces/*.csv
+    python filter_eval.py traces/session.csv --configs candidates.json --latency 0.06
+
+candidates.json holds a list of filter configs (see cursor_filters.DEFAULT_FILTER_CONFIG);
+without it a small built-in set is compared.
+"""
+import argparse
+import csv
+import json
+import sys
+
+import numpy as np
+
+from cursor_filters import make_cursor_filter
+
+DEFAULT_CANDIDATES = [
+    {"name": "exponential-5", "type": "exponential", "smoothening": 5, "predict": False},
+    {"name": "one-euro", "type": "one_euro", "predict": False},
+    {"name": "one-euro+predict", "type": "one_euro", "predict": True},
+    {"name": "one-euro-smooth+predict", "type": "one_euro", "min_cutoff": 0.5, "beta": 0.02, "predict": True},
+]
+
+
+def load_trace(path):
+    with open(path, newline="") as f:
+        rows = [(float(r["t"]), float(r["x"]), float(r["y"])) for r in csv.DictReader(f)]
+    return np.array(rows, dtype=np.float64).reshape(-1, 3)
+
+
+def run_filter(config, trace, latency=0.0):
+    cursor_filter = make_cursor_filter(config)
+    out = np.empty((len(trace), 2))
+    for i, (t, x, y) in enumerate(trace):
+        out[i] = cursor_filter(x, y, t, latency)
+    return out
+
+
+def score(trace, out, still_speed=60.0, max_lag_s=0.3):
+    """Return jitter (px RMS per frame while the hand is still), lag (ms) and mean error (px)"""
+    t, raw = trace[:, 0], trace[:, 1:]
+    if len(t) < 3:
+        return {"jitter_px": None, "lag_ms": None, "error_px": None}
+
+    dt = np.maximum(np.diff(t), 1e-6)
+    # Speed of a box-smoothed path, so landmark noise on a still hand doesn't count as motion
+    kernel = np.ones(7) / 7
+    smooth = np.column_stack([np.convolve(np.pad(raw[:, i], 3, mode="edge"), kernel, mode="valid")
+                              for i in range(2)])
+    raw_speed = np.linalg.norm(np.diff(smooth, axis=0), axis=1) / dt
+    step = np.linalg.norm(np.diff(out, axis=0), axis=1)
+
+    still = raw_speed < still_speed
+    jitter = float(np.sqrt(np.mean(step[still] ** 2))) if still.any() else 0.0
+
+    # Lag: the time shift of the raw signal that best lines it up with the output while moving
+    moving = np.concatenate([[False], ~still])
+    lag_ms = 0.0
+    if moving.sum() > 5:
+        frame_dt = float(np.median(dt))
+        best_err = None
+        for shift in np.arange(-max_lag_s, max_lag_s + frame_dt / 2, frame_dt / 2):
+            shifted = np.column_stack([np.interp(t - shift, t, raw[:, 0]), np.interp(t - shift, t, raw[:, 1])])
+            err = np.mean(np.linalg.norm(out[moving] - shifted[moving], axis=1))
+            if best_err is None or err < best_err:
+                best_err, lag_ms = err, shift * 1000
+
+    error = float(np.mean(np.linalg.norm(out - raw, axis=1)))
+    return {"jitter_px": round(jitter, 3), "lag_ms": round(float(lag_ms), 1), "error_px": round(error, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare cursor filters on recorded traces")
+    parser.add_argument("traces", nargs="+", help="CSV traces with t,x,y columns")
+    parser.add_argument("--configs", help="JSON file with a list of filter configs to compare")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="pipeline latency in seconds passed to predictive filters")
+    parser.add_argument("--still-speed", type=float, default=60.0,
+                        help="raw speed (px/s) below which the hand counts as still")
+    args = parser.parse_args(argv)
+
+    candidates = DEFAULT_CANDIDATES
+    if args.configs:
+        with open(args.configs) as f:
+            candidates = json.load(f)
+
+    traces = [load_trace(path) for path in args.traces]
+    print(f"{'filter':<28}{'jitter px':>12}{'lag ms':>10}{'error px':>11}")
+    for i, config in enumerate(candidates):
+        name = config.get("name", f"config-{i}")
+        scores = [score(trace, run_filter(config, trace, args.latency), args.still_speed)
+                  for trace in traces]
+        scores = [s for s in scores if s["lag_ms"] is not None]
+        if not scores:
+            print(f"{name:<28}{'-':>12}{'-':>10}{'-':>11}")
+            continue
+        jitter = np.mean([s["jitter_px"] for s in scores])
+        lag = np.mean([s["lag_ms"] for s in scores])
+        error = np.mean([s["error_px"] for s in scores])
+        print(f"{name:<28}{jitter:>12.3f}{lag:>10.1f}{error:>11.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
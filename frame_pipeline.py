@@ -0,0 +1,380 @@
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from stage_metrics import metrics
+
+
+class FramePool:
+    """Recycles frame buffers between the pipeline threads
+
+    acquire() hands out a free buffer of the requested shape and only allocates
+    when none is free; release() gives it back once nobody reads it any more.
+    Arrays the pool didn't hand out are ignored by release().
+    """
+
+    def __init__(self):
+        self.free = {}
+        self.owned = {}
+        self.lock = threading.Lock()
+
+    @property
+    def allocated(self):
+        return len(self.owned)
+
+    def acquire(self, shape):
+        with self.lock:
+            free = self.free.get(shape)
+            if free:
+                return free.pop()
+        buffer = np.empty(shape, dtype=np.uint8)
+        with self.lock:
+            # Holding a reference keeps ids unique for as long as the pool lives
+            self.owned[id(buffer)] = buffer
+        return buffer
+
+    def release(self, buffer):
+        if buffer is None:
+            return
+        with self.lock:
+            if self.owned.get(id(buffer)) is buffer:
+                self.free.setdefault(buffer.shape, []).append(buffer)
+
+
+class ScratchBuffer:
+    """Growable block of memory that hands out C-contiguous uint8 arrays of any shape
+
+    Every view() reuses the same memory, so a view is only valid until the next
+    call; meant for per-frame temporaries such as the RGB copy or a resized crop.
+    """
+
+    def __init__(self):
+        self.data = np.empty(0, dtype=np.uint8)
+
+    def view(self, shape):
+        size = math.prod(shape)
+        if self.data.size < size:
+            self.data = np.empty(size, dtype=np.uint8)
+        return self.data[:size].reshape(shape)
+
+
+def mirror_results(results):
+    """Mirror hand tracking results horizontally, as if the image had been flipped"""
+    for hand_landmarks in results.multi_hand_landmarks or []:
+        for lm in hand_landmarks.landmark:
+            lm.x = 1.0 - lm.x
+    # MediaPipe labels hands assuming a mirrored (selfie) image
+    for handedness in results.multi_handedness or []:
+        for classification in handedness.classification:
+            classification.label = "Left" if classification.label == "Right" else "Right"
+
+
+class LatestFrameGrabber:
+    """Reads frames from a capture on its own thread and keeps only the newest one
+
+    Frames are read into buffers from pool, and a frame that is replaced before
+    anyone took it goes straight back. With an IdleScheduler that has gone idle,
+    frames beyond its idle rate are grabbed (to keep the driver's queue drained)
+    but not decoded.
+    """
+
+    def __init__(self, capture, scheduler=None, pool=None):
+        self.capture = capture
+        self.scheduler = scheduler
+        self.pool = pool or FramePool()
+        self.frame_shape = None
+        self.full_capture_size = None
+        self.last_read = 0.0
+        self.frame = None
+        self.seq = 0
+        self.timestamp = 0.0
+        self.dropped = 0
+        self.finished = False
+        self.running = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.finished = False
+            self.thread = threading.Thread(target=self._capture_loop)
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=1)
+            self.thread = None
+
+    def _apply_capture_size(self, idle):
+        size = self.scheduler.idle_capture_size
+        if not size or not hasattr(self.capture, "get"):
+            return
+        if idle and self.full_capture_size is None:
+            self.full_capture_size = (self.capture.get(3), self.capture.get(4))
+            self.capture.set(3, size[0])
+            self.capture.set(4, size[1])
+        elif not idle and self.full_capture_size is not None:
+            self.capture.set(3, self.full_capture_size[0])
+            self.capture.set(4, self.full_capture_size[1])
+            self.full_capture_size = None
+
+    def _capture_loop(self):
+        while self.running:
+            if self.scheduler is not None:
+                idle = self.scheduler.idle
+                self._apply_capture_size(idle)
+                if idle and time.time() - self.last_read < self.scheduler.frame_interval:
+                    # grab() waits for the next frame like read() does, so this never spins
+                    grab = getattr(self.capture, "grab", None)
+                    if grab() if grab else self.capture.read()[0]:
+                        continue
+                    with self.condition:
+                        self.finished = True
+                        self.condition.notify_all()
+                    break
+            self.last_read = time.time()
+            buffer = self.pool.acquire(self.frame_shape) if self.frame_shape else None
+            with metrics.time("capture"):
+                success, frame = self.capture.read(buffer)
+            if frame is not buffer:
+                # First frame, or the size changed: the capture allocated a new array
+                self.pool.release(buffer)
+            with self.condition:
+                if not success:
+                    self.finished = True
+                    self.condition.notify_all()
+                    break
+                self.frame_shape = frame.shape
+                # Overwrite instead of queueing: a frame nobody picked up is stale
+                if self.frame is not None:
+                    self.dropped += 1
+                    self.pool.release(self.frame)
+                self.frame = frame
+                self.seq += 1
+                self.timestamp = time.time()
+                self.condition.notify_all()
+        self.running = False
+
+    def take(self, last_seq, timeout=1.0):
+        """Wait for a frame newer than last_seq and hand it over
+
+        Returns (seq, timestamp, frame), or None when the capture ended or timed out.
+        """
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.seq <= last_seq or self.frame is None:
+                remaining = deadline - time.time()
+                if self.finished or not self.running or remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+            frame = self.frame
+            self.frame = None
+            return self.seq, self.timestamp, frame
+
+
+class _NoHands:
+    """Stands in for hands.process results on frames where detection was skipped"""
+    multi_hand_landmarks = None
+    multi_handedness = None
+
+
+NO_HANDS = _NoHands()
+
+
+class TrackedFrame:
+    """A camera frame together with the (already mirrored) hand tracking results for it
+
+    Tracking runs on the raw camera image and only the landmarks are mirrored. The
+    mirrored picture the user sees is made the first time .frame is used, at
+    width x height, so a loop that doesn't draw never pays for it. release()
+    returns both buffers to the pool; the frame must not be used afterwards.
+
+    clock() is the time the modes should act at: the wall clock for a live camera,
+    the recorded time when a trace is replayed faster than real time.
+    """
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, seq, captured_at, raw, results, size, pool=None):
+        self.seq = seq
+        self.captured_at = captured_at
+        self.processed_at = time.time()
+        self.raw = raw
+        self.results = results
+        self.width, self.height = size
+        self.pool = pool
+        self._frame = None
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            shape = (self.height, self.width, 3)
+            frame = self.pool.acquire(shape) if self.pool else np.empty(shape, dtype=np.uint8)
+            if self.raw.shape == shape:
+                cv2.flip(self.raw, 1, dst=frame)
+            else:
+                # Captured at the idle resolution; show it at the active size
+                cv2.resize(self.raw, (self.width, self.height), dst=frame)
+                cv2.flip(frame, 1, dst=frame)
+            self._frame = frame
+        return self._frame
+
+    def release(self):
+        if self.pool:
+            self.pool.release(self.raw)
+            self.pool.release(self._frame)
+        self.raw = self._frame = None
+
+
+class HandTrackingPipeline:
+    """Capture -> inference -> render pipeline
+
+    The capture stage runs on a LatestFrameGrabber thread, the inference stage
+    (color conversion, hands.process) runs on its own thread, and the
+    render/output stage is whoever calls next_frame(), normally the mode loop on
+    the main thread. Every hand-off keeps only the newest item, so a slow stage
+    drops stale frames instead of letting them pile up.
+
+    Nothing is allocated per frame once running: camera frames cycle through a
+    FramePool, the RGB copy and idle downscale live in ScratchBuffers, and the
+    RGB input is marked read-only so MediaPipe can use it without copying.
+    Callers release() each TrackedFrame when they are done with it.
+
+    An optional IdleScheduler throttles capture and detection while no hand is in
+    view. Frames are always handed on at the size they had while active, so the
+    modes' pixel coordinates don't change when the camera resolution does.
+    """
+
+    def __init__(self, capture, hands, scheduler=None):
+        self.pool = FramePool()
+        self.grabber = LatestFrameGrabber(capture, scheduler, self.pool)
+        self.hands = hands
+        self.rgb_buffer = ScratchBuffer()
+        self.small_buffer = ScratchBuffer()
+        self.scheduler = scheduler
+        self.frame_size = None
+        self.latest = None
+        self.dropped = 0
+        self.running = False
+        self.paused = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def pause(self):
+        """Keep the camera open and drained but skip inference, e.g. while a menu is shown"""
+        self.paused = True
+
+    def resume(self):
+        with self.condition:
+            # Whatever was tracked before the pause is stale by now
+            if self.latest is not None:
+                self.latest.release()
+            self.latest = None
+            self.paused = False
+            if self.scheduler is not None:
+                self.scheduler.reset()
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.latest = None
+            self.grabber.start()
+            self.thread = threading.Thread(target=self._inference_loop)
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.grabber.stop()
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=1)
+            self.thread = None
+
+    def _inference_loop(self):
+        last_seq = 0
+        while self.running:
+            item = self.grabber.take(last_seq, timeout=0.5)
+            if item is None:
+                if self.grabber.finished:
+                    break
+                continue
+            last_seq, captured_at, raw = item
+            if self.paused:
+                self.pool.release(raw)
+                continue
+
+            scheduler = self.scheduler
+            idle = scheduler is not None and scheduler.idle
+            raw_size = raw.shape[1], raw.shape[0]
+            if self.frame_size is None:
+                self.frame_size = raw_size
+            elif not idle and (scheduler is None or raw_size != tuple(scheduler.idle_capture_size or ())):
+                # Right after waking the camera may still deliver idle-size frames for a while;
+                # those are shown at the active size like the idle ones
+                self.frame_size = raw_size
+
+            detect = scheduler is None or scheduler.should_detect()
+            if detect:
+                with metrics.time("color"):
+                    source = raw
+                    if idle and raw.shape[1] > scheduler.idle_width:
+                        height = int(raw.shape[0] * scheduler.idle_width / raw.shape[1])
+                        source = self.small_buffer.view((height, scheduler.idle_width, 3))
+                        cv2.resize(raw, (scheduler.idle_width, height), dst=source, interpolation=cv2.INTER_AREA)
+                    rgb = self.rgb_buffer.view(source.shape)
+                    cv2.cvtColor(source, cv2.COLOR_BGR2RGB, dst=rgb)
+                    rgb.flags.writeable = False
+
+                with metrics.time("hands"):
+                    results = self.hands.process(rgb)
+                # Cheaper than flipping every frame's pixels before tracking
+                mirror_results(results)
+                if scheduler is not None and scheduler.observe(bool(results.multi_hand_landmarks)):
+                    # Any ROI the tracker kept is in the small frame's pixels
+                    if hasattr(self.hands, "reset"):
+                        self.hands.reset()
+            else:
+                results = NO_HANDS
+
+            tracked = TrackedFrame(last_seq, captured_at, raw, results, self.frame_size, self.pool)
+            with self.condition:
+                if self.latest is not None:
+                    self.dropped += 1
+                    self.latest.release()
+                self.latest = tracked
+                self.condition.notify_all()
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def next_frame(self, timeout=1.0):
+        """Block until a tracked frame is ready and return it
+
+        Returns None on timeout or once the capture has ended.
+        """
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.latest is None:
+                remaining = deadline - time.time()
+                if not self.running:
+                    return None
+                if remaining <= 0:
+                    # Camera stalled; the caller checks self.running to tell this apart
+                    return None
+                self.condition.wait(remaining)
+            tracked = self.latest
+            self.latest = None
+            return tracked
@@ -0,0 +1,95 @@
+import numpy as np
+
+# Mediapipe hand landmark indices
+WRIST = 0
+THUMB_TIP = 4
+INDEX_TIP = 8
+MIDDLE_TIP = 12
+RING_TIP = 16
+PINKY_TIP = 20
+MIDDLE_MCP = 9
+
+# Per finger (thumb, index, middle, ring, pinky): base joint, middle joint, tip
+FINGER_MCPS = np.array([2, 5, 9, 13, 17])
+FINGER_PIPS = np.array([3, 6, 10, 14, 18])
+FINGER_TIPS = np.array([4, 8, 12, 16, 20])
+
+# Pinch distances computed every frame, in pixels
+PINCH_PAIRS = np.array([
+    (THUMB_TIP, INDEX_TIP),
+    (INDEX_TIP, MIDDLE_TIP),
+    (THUMB_TIP, MIDDLE_TIP),
+    (THUMB_TIP, RING_TIP),
+    (THUMB_TIP, PINKY_TIP),
+])
+
+# Layout of the feature vector
+PINCH_THUMB_INDEX = 0
+PINCH_INDEX_MIDDLE = 1
+PINCH_THUMB_MIDDLE = 2
+PINCH_THUMB_RING = 3
+PINCH_THUMB_PINKY = 4
+EXTENDED = slice(5, 10)     # 1.0 when the finger is straightened away from the wrist
+BEND_ANGLE = slice(10, 15)  # angle at the middle joint in radians, pi = straight
+HAND_SCALE = 15             # wrist to middle-finger base, for size-independent thresholds
+NUM_FEATURES = 16
+
+
+class HandFeatures:
+    """Landmarks of one hand as a reused (21, 3) float32 array plus a derived feature vector
+
+    update() copies mediapipe landmarks into the array in pixel units (z is scaled
+    like x) and recomputes every feature in one vectorized pass, so the gesture
+    logic reads numbers from self.features instead of building tuples per frame.
+    """
+
+    def __init__(self):
+        self.landmarks = np.zeros((21, 3), dtype=np.float32)
+        self.features = np.zeros(NUM_FEATURES, dtype=np.float32)
+        self._scale = np.ones(3, dtype=np.float32)
+
+    def update(self, hand_landmarks, frame_width, frame_height):
+        flat = np.fromiter((v for lm in hand_landmarks.landmark for v in (lm.x, lm.y, lm.z)),
+                           dtype=np.float32, count=63)
+        self.landmarks[:] = flat.reshape(21, 3)
+        self._scale[0] = frame_width
+        self._scale[1] = frame_height
+        self._scale[2] = frame_width
+        self.landmarks *= self._scale
+        self.compute()
+        return self.features
+
+    def update_array(self, landmarks, frame_width, frame_height):
+        """Same as update() for landmarks already in a normalized (21, 3) array"""
+        self.landmarks[:] = landmarks
+        self._scale[0] = frame_width
+        self._scale[1] = frame_height
+        self._scale[2] = frame_width
+        self.landmarks *= self._scale
+        self.compute()
+        return self.features
+
+    def compute(self):
+        lms = self.landmarks
+        out = self.features
+
+        pinch = lms[PINCH_PAIRS[:, 0], :2] - lms[PINCH_PAIRS[:, 1], :2]
+        out[:len(PINCH_PAIRS)] = np.hypot(pinch[:, 0], pinch[:, 1])
+
+        wrist = lms[WRIST]
+        tip_reach = np.linalg.norm(lms[FINGER_TIPS] - wrist, axis=1)
+        pip_reach = np.linalg.norm(lms[FINGER_PIPS] - wrist, axis=1)
+        out[EXTENDED] = tip_reach > pip_reach
+
+        to_base = lms[FINGER_MCPS] - lms[FINGER_PIPS]
+        to_tip = lms[FINGER_TIPS] - lms[FINGER_PIPS]
+        norms = np.linalg.norm(to_base, axis=1) * np.linalg.norm(to_tip, axis=1)
+        cos = np.einsum("ij,ij->i", to_base, to_tip) / np.maximum(norms, 1e-6)
+        out[BEND_ANGLE] = np.arccos(np.clip(cos, -1.0, 1.0))
+
+        out[HAND_SCALE] = np.linalg.norm(lms[MIDDLE_MCP, :2] - wrist[:2])
+        return out
+
+    def point(self, index):
+        """(x, y) pixel position of a landmark"""
+        return self.landmarks[index, 0], self.landmarks[index, 1]
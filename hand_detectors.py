@@ -0,0 +1,225 @@
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from frame_pipeline import ScratchBuffer
+
+NUM_LANDMARKS = 21
+INDEX_TIP = 8
+
+
+class Landmark:
+    """Minimal stand-in for a MediaPipe NormalizedLandmark"""
+
+    def __init__(self, x, y, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def HasField(self, name):
+        # mediapipe's drawing_utils asks for visibility/presence, which we never set
+        return False
+
+
+class HandLandmarks:
+    def __init__(self, landmark):
+        self.landmark = landmark
+
+
+class Classification:
+    def __init__(self, label, score=1.0, index=0):
+        self.label = label
+        self.score = score
+        self.index = index
+
+
+class Handedness:
+    def __init__(self, classification):
+        self.classification = classification
+
+
+class HandResults:
+    """Detection results shaped like the object hands.process() returns
+
+    supports_pinch is False when the landmarks don't have real finger positions,
+    so distances between fingertips mean nothing and pinch gestures must be skipped.
+    """
+
+    def __init__(self, multi_hand_landmarks=None, multi_handedness=None, supports_pinch=True):
+        self.multi_hand_landmarks = multi_hand_landmarks
+        self.multi_handedness = multi_handedness
+        self.supports_pinch = supports_pinch
+
+
+def supports_pinch(results):
+    """Whether fingertip distances in results can be used for pinches (MediaPipe results always can)"""
+    return getattr(results, "supports_pinch", True)
+
+
+class MediaPipeDetector:
+    """MediaPipe Hands at a given model complexity (0 = lite, 1 = full)"""
+
+    def __init__(self, model_complexity=1, min_detection_confidence=0.7, min_tracking_confidence=0.7,
+                 max_num_hands=1):
+        import mediapipe as mp
+        self.name = "mediapipe_full" if model_complexity else "mediapipe_lite"
+        self.hands = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=max_num_hands,
+                                              model_complexity=model_complexity,
+                                              min_detection_confidence=min_detection_confidence,
+                                              min_tracking_confidence=min_tracking_confidence)
+
+    def process(self, rgb):
+        return self.hands.process(rgb)
+
+    def close(self):
+        self.hands.close()
+
+
+class ContourDetector:
+    """Classical skin-colour tracker for coarse cursor control on slow machines
+
+    The largest skin-coloured blob (YCrCb range) is taken as the hand: its topmost
+    point becomes the index fingertip and every other landmark sits on its centroid.
+    There are no real finger positions, so results say supports_pinch=False and the
+    modes skip clicks and typing; the face is skin-coloured too, so this works best
+    with the hand raised above it.
+    """
+
+    name = "contour"
+
+    def __init__(self, lower=(0, 133, 77), upper=(255, 173, 127), min_area=0.01, work_width=320):
+        self.lower = np.array(lower, dtype=np.uint8)
+        self.upper = np.array(upper, dtype=np.uint8)
+        self.min_area = min_area
+        self.work_width = work_width
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        # Every intermediate image is rebuilt in the same memory each frame
+        self.small_buffer = ScratchBuffer()
+        self.ycrcb_buffer = ScratchBuffer()
+        self.mask_buffer = ScratchBuffer()
+        self.opened_buffer = ScratchBuffer()
+
+    def process(self, rgb):
+        height, width = rgb.shape[:2]
+        work_height = max(int(height * self.work_width / width), 1)
+        small = self.small_buffer.view((work_height, self.work_width, 3))
+        cv2.resize(rgb, (self.work_width, work_height), dst=small, interpolation=cv2.INTER_AREA)
+
+        ycrcb = self.ycrcb_buffer.view((work_height, self.work_width, 3))
+        cv2.cvtColor(small, cv2.COLOR_RGB2YCrCb, dst=ycrcb)
+        raw_mask = self.mask_buffer.view((work_height, self.work_width))
+        cv2.inRange(ycrcb, self.lower, self.upper, dst=raw_mask)
+        mask = self.opened_buffer.view((work_height, self.work_width))
+        cv2.morphologyEx(raw_mask, cv2.MORPH_OPEN, self.kernel, dst=mask)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return HandResults(supports_pinch=False)
+
+        blob = max(contours, key=cv2.contourArea)
+        moments = cv2.moments(blob)
+        if moments["m00"] < self.min_area * mask.size:
+            return HandResults(supports_pinch=False)
+
+        center_x = moments["m10"] / moments["m00"] / self.work_width
+        center_y = moments["m01"] / moments["m00"] / work_height
+        top = blob[blob[:, :, 1].argmin()][0]
+
+        landmarks = [Landmark(center_x, center_y) for _ in range(NUM_LANDMARKS)]
+        landmarks[INDEX_TIP] = Landmark(top[0] / self.work_width, top[1] / work_height)
+        return HandResults([HandLandmarks(landmarks)], supports_pinch=False)
+
+    def close(self):
+        pass
+
+
+def default_detector_factories(min_detection_confidence=0.7, min_tracking_confidence=0.7, max_num_hands=1):
+    """(name, factory) pairs from most accurate to cheapest, skipping MediaPipe if it isn't installed
+
+    The contour tracker only ever finds one hand, whatever max_num_hands says.
+    """
+    def mediapipe_factory(complexity):
+        return lambda: MediaPipeDetector(complexity, min_detection_confidence, min_tracking_confidence,
+                                         max_num_hands)
+
+    factories = []
+    try:
+        import mediapipe  # noqa: F401
+        factories += [("mediapipe_full", mediapipe_factory(1)), ("mediapipe_lite", mediapipe_factory(0))]
+    except ImportError:
+        pass
+    factories.append(("contour", ContourDetector))
+    return factories
+
+
+class AdaptiveDetector:
+    """Runs the most accurate detector that fits a per-frame time budget
+
+    factories are (name, factory) pairs ordered from most accurate to cheapest.
+    select() times candidates on a sample frame and keeps the first one within
+    budget_ms. While running, the median of the last `window` calls is checked
+    and the next cheaper detector takes over once it exceeds budget_ms * tolerance,
+    e.g. when a hand shows up and the landmark model starts running, or the machine
+    gets busy. It never upgrades again by itself; call select() for that.
+    """
+
+    def __init__(self, factories, budget_ms, window=30, tolerance=1.25, on_change=None):
+        self.factories = list(factories)
+        if not self.factories:
+            raise ValueError("No hand detectors to choose from")
+        self.budget_ms = budget_ms
+        self.window = window
+        self.tolerance = tolerance
+        self.on_change = on_change
+        self.index = None
+        self.detector = None
+        self.timings = deque(maxlen=window)
+
+    @property
+    def name(self):
+        return self.factories[self.index][0] if self.index is not None else None
+
+    def use(self, name_or_index):
+        index = name_or_index
+        if isinstance(name_or_index, str):
+            index = [name for name, _ in self.factories].index(name_or_index)
+        if self.detector is not None:
+            self.detector.close()
+        self.detector = self.factories[index][1]()
+        self.index = index
+        self.timings.clear()
+        if self.on_change:
+            self.on_change(self.name)
+
+    def select(self, sample, trials=5):
+        """Use the most accurate detector whose median time on sample is within budget"""
+        for index in range(len(self.factories)):
+            self.use(index)
+            self.detector.process(sample)  # first call includes one-off setup
+            times = []
+            for _ in range(trials):
+                start = time.perf_counter()
+                self.detector.process(sample)
+                times.append((time.perf_counter() - start) * 1000)
+            if np.median(times) <= self.budget_ms:
+                break
+        self.timings.clear()
+        return self.name
+
+    def process(self, rgb):
+        if self.detector is None:
+            self.use(0)
+        start = time.perf_counter()
+        results = self.detector.process(rgb)
+        self.timings.append((time.perf_counter() - start) * 1000)
+
+        if (len(self.timings) == self.window and self.index < len(self.factories) - 1
+                and np.median(self.timings) > self.budget_ms * self.tolerance):
+            self.use(self.index + 1)
+        return results
+
+    def close(self):
+        if self.detector is not None:
+            self.detector.close()
+            self.detector = None
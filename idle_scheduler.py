@@ -0,0 +1,73 @@
+import time
+
+
+class IdleScheduler:
+    """Decides how hard the hand tracking pipeline works based on whether a hand is in view
+
+    After idle_after frames in a row without a hand the pipeline goes idle: frames
+    are read at idle_fps (the rest are grabbed but never decoded), the camera is
+    asked for idle_capture_size if one is given, detection runs on a copy at most
+    idle_width pixels wide, and only on every detect_every-th frame. The first
+    detection with a hand switches straight back to full rate, so a hand that
+    appears is noticed within wake_latency seconds.
+    """
+
+    def __init__(self, idle_after=45, idle_fps=10, detect_every=3, idle_width=640, idle_capture_size=None):
+        self.idle_after = idle_after
+        self.idle_fps = idle_fps
+        self.detect_every = detect_every
+        self.idle_width = idle_width
+        self.idle_capture_size = idle_capture_size
+        self.idle = False
+        self.empty_frames = 0
+        self.skipped = 0
+        self.idle_since = None
+        self.idle_time = 0.0
+        self.wakeups = 0
+
+    @property
+    def frame_interval(self):
+        """Minimum seconds between decoded frames"""
+        return 1.0 / self.idle_fps if self.idle and self.idle_fps else 0.0
+
+    @property
+    def wake_latency(self):
+        """Worst-case delay between a hand appearing and full-rate tracking resuming"""
+        return self.detect_every / self.idle_fps if self.idle_fps else 0.0
+
+    def should_detect(self):
+        """Whether to run hand detection on the current frame"""
+        if not self.idle:
+            return True
+        self.skipped += 1
+        if self.skipped >= self.detect_every:
+            self.skipped = 0
+            return True
+        return False
+
+    def observe(self, hand_present):
+        """Feed the outcome of a detection; returns True when this woke the pipeline up"""
+        if hand_present:
+            self.empty_frames = 0
+            if self.idle:
+                self.idle = False
+                self.idle_time += time.time() - self.idle_since
+                self.idle_since = None
+                self.wakeups += 1
+                return True
+            return False
+
+        self.empty_frames += 1
+        if not self.idle and self.empty_frames >= self.idle_after:
+            self.idle = True
+            self.idle_since = time.time()
+            # Detect on the very next frame, then every detect_every-th
+            self.skipped = self.detect_every - 1
+        return False
+
+    def reset(self):
+        if self.idle:
+            self.idle_time += time.time() - self.idle_since
+        self.idle = False
+        self.idle_since = None
+        self.empty_frames = 0
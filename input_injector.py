@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from stage_metrics import metrics
+
+
+class InputInjector:
+    """Sends mouse and keyboard events to the OS from its own thread
+
+    The vision loop only queues events, so pyautogui's PAUSE, failsafe checks and
+    pynput calls never stall it. Consecutive cursor moves are merged into the newest
+    target position; clicks, key taps and text are delivered strictly in the order
+    queued. Every delivered event records how long it waited in the queue.
+    """
+
+    def __init__(self, gui, keyboard, history=512):
+        self.gui = gui
+        self.keyboard = keyboard
+        self.events = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.busy = False
+        self.thread = None
+
+        self.counts = {}
+        self.waits = {}
+        self.history = history
+        self.coalesced = 0
+        self.chars_typed = 0
+        self.typing_time = 0.0
+        self.errors = 0
+        self.last_error = ""
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._inject_loop)
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.flush(timeout=1)
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=1)
+            self.thread = None
+
+    def move_to(self, x, y):
+        with self.condition:
+            if self.events and self.events[-1][0] == "move":
+                # Cursor hasn't caught up yet; only the newest target matters
+                self.events[-1] = ("move", (x, y), time.time())
+                self.coalesced += 1
+            else:
+                self.events.append(("move", (x, y), time.time()))
+            self.condition.notify()
+
+    def click(self, button="left"):
+        self._put("click", button)
+
+    def tap(self, key):
+        """Press and release a key on the pynput controller"""
+        self._put("key", key)
+
+    def type_text(self, text):
+        """Type a whole string as one event (dictation, word completions)"""
+        if text:
+            self._put("text", text)
+
+    def _put(self, kind, payload):
+        with self.condition:
+            self.events.append((kind, payload, time.time()))
+            self.condition.notify()
+
+    def flush(self, timeout=1.0):
+        """Wait until every queued event has been delivered"""
+        deadline = time.time() + timeout
+        with self.condition:
+            while (self.events or self.busy) and self.running:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def _inject_loop(self):
+        while True:
+            with self.condition:
+                while not self.events and self.running:
+                    self.condition.wait()
+                if not self.events:
+                    break
+                kind, payload, queued_at = self.events.popleft()
+                self.busy = True
+
+            wait = time.time() - queued_at
+            started = time.perf_counter()
+            try:
+                if kind == "move":
+                    self.gui.moveTo(payload[0], payload[1], _pause=False)
+                elif kind == "click":
+                    self.gui.click(button=payload, _pause=False)
+                elif kind == "key":
+                    self.keyboard.press(payload)
+                    self.keyboard.release(payload)
+                elif kind == "text":
+                    self.keyboard.type(payload)
+                    self.chars_typed += len(payload)
+                    self.typing_time += time.perf_counter() - started
+            except Exception as e:
+                # e.g. pyautogui's failsafe corner; drop the event, keep the thread alive
+                self.errors += 1
+                self.last_error = str(e)
+            metrics.record("inject", time.perf_counter() - started)
+
+            with self.condition:
+                self.counts[kind] = self.counts.get(kind, 0) + 1
+                self.waits.setdefault(kind, deque(maxlen=self.history)).append(wait)
+                self.busy = False
+                self.condition.notify_all()
+
+    def latency_stats(self):
+        """Per event kind: delivered count and queue wait percentiles in milliseconds"""
+        with self.condition:
+            snapshot = {kind: list(waits) for kind, waits in self.waits.items()}
+            counts = dict(self.counts)
+        stats = {}
+        for kind, waits in snapshot.items():
+            p50, p95, p99 = np.percentile(np.array(waits) * 1000, [50, 95, 99])
+            stats[kind] = {"count": counts[kind], "wait_p50_ms": round(float(p50), 2),
+                           "wait_p95_ms": round(float(p95), 2), "wait_p99_ms": round(float(p99), 2),
+                           "wait_max_ms": round(max(waits) * 1000, 2)}
+        stats["coalesced_moves"] = self.coalesced
+        stats["typed_chars"] = self.chars_typed
+        stats["typed_chars_per_s"] = round(self.chars_typed / self.typing_time, 1) if self.typing_time else None
+        stats["errors"] = self.errors
+        return stats
@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+
+
+def draw_keyboard_buttons(img, button_list):
+    for button in button_list:
+        x, y = button.pos
+        w, h = button.size
+        cv2.rectangle(img, button.pos, (x + w, y + h), (96, 96, 96), cv2.FILLED)
+        cv2.putText(img, button.text, (x + 10, y + 60),
+                    cv2.FONT_HERSHEY_PLAIN, 2, (255, 255, 255), 2)
+    return img
+
+
+class KeyboardOverlay:
+    """Static keyboard layer (buttons, help text, CAPS indicator) rendered once and cached
+
+    composite() pastes the cached layer onto a frame with one masked cv2.copyTo,
+    limited to the rectangle the layer covers. The layer is only re-rendered when the frame size or the caps state changes, or after
+    set_layout() is called with a new button list.
+    """
+
+    def __init__(self, button_list, help_text=()):
+        self.button_list = button_list
+        self.help_text = list(help_text)
+        self.image = None
+        self.mask = None
+        self.bounds = None
+        self.cache_key = None
+
+    def set_layout(self, button_list, help_text=None):
+        self.button_list = button_list
+        if help_text is not None:
+            self.help_text = list(help_text)
+        self.cache_key = None
+
+    def _render(self, frame_shape, capitalize):
+        image = np.zeros(frame_shape, dtype=np.uint8)
+        draw_keyboard_buttons(image, self.button_list)
+
+        # Help text in top left
+        y_pos = 100
+        for line in self.help_text:
+            cv2.putText(image, line, (20, y_pos), cv2.FONT_HERSHEY_PLAIN, 1, (255, 255, 255), 1)
+            y_pos += 25
+
+        if capitalize:
+            cv2.putText(image, "CAPS ON", (1050, 50), cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 255), 2)
+
+        # Nothing in the layer is drawn in pure black, so any lit pixel belongs to it
+        mask = (image.max(axis=2) > 0).astype(np.uint8)
+        x, y, w, h = cv2.boundingRect(mask)
+        self.bounds = (slice(y, y + h), slice(x, x + w))
+        self.image = image[self.bounds]
+        self.mask = mask[self.bounds]
+
+    def composite(self, frame, capitalize=False):
+        cache_key = (frame.shape, capitalize)
+        if cache_key != self.cache_key:
+            self._render(frame.shape, capitalize)
+            self.cache_key = cache_key
+        if self.image.size:
+            region = frame[self.bounds]
+            cv2.copyTo(self.image, self.mask, region)
+        return frame
+
+
+class KeyIndex:
+    """Constant-time key lookup: a per-pixel map from position to button index"""
+
+    def __init__(self, button_list):
+        self.build(button_list)
+
+    def build(self, button_list):
+        self.button_list = button_list
+        width = max((b.pos[0] + b.size[0] for b in button_list), default=0) + 1
+        height = max((b.pos[1] + b.size[1] for b in button_list), default=0) + 1
+        self.index_map = np.full((height, width), -1, dtype=np.int16)
+        for i, button in enumerate(button_list):
+            x, y = button.pos
+            w, h = button.size
+            # Same strict bounds as the old x < px < x + w scan
+            self.index_map[y + 1:y + h, x + 1:x + w] = i
+
+    def lookup(self, point):
+        """Return (index, button) under the point, or (None, None)"""
+        px, py = int(point[0]), int(point[1])
+        if 0 <= py < self.index_map.shape[0] and 0 <= px < self.index_map.shape[1]:
+            i = int(self.index_map[py, px])
+            if i >= 0:
+                return i, self.button_list[i]
+        return None, None
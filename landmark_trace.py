@@ -0,0 +1,236 @@
+"""Record hand landmarks from a session and replay them through the modes
+
+A trace is an append-only file of fixed-size records, one per frame a mode
+consumed: capture time, latency, frame size and up to MAX_HANDS hands with
+their (21, 3) normalized, already mirrored landmarks, handedness and score.
+Fixed-size records make the file memory-mappable, and a session that crashed
+mid-write still loads up to its last whole record.
+
+    python MouseKeyborad.py --record session.trace
+    python benchmark.py --mode mouse --trace session.trace
+    python landmark_trace.py info session.trace
+    python landmark_trace.py cursor session.trace session.csv   (for filter_eval.py)
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+from frame_pipeline import TrackedFrame
+from hand_detectors import Classification, HandLandmarks, HandResults, Handedness, Landmark
+
+MAGIC = b"GVTRACE1"
+MAX_HANDS = 2
+NUM_LANDMARKS = 21
+HANDEDNESS_CODES = {"Left": 0, "Right": 1}
+HANDEDNESS_LABELS = {code: label for label, code in HANDEDNESS_CODES.items()}
+RECORD_DTYPE = np.dtype([
+    ("captured_at", "<f8"),
+    ("latency", "<f4"),  # capture to processing by the mode, in seconds
+    ("seq", "<u4"),
+    ("width", "<u2"),
+    ("height", "<u2"),
+    ("hand_count", "u1"),
+    ("handedness", "i1", (MAX_HANDS,)),  # HANDEDNESS_CODES, -1 when unknown
+    ("score", "<f4", (MAX_HANDS,)),
+    ("landmarks", "<f4", (MAX_HANDS, NUM_LANDMARKS, 3)),
+])
+# Magic, then the record size and hand slots so a reader can reject other layouts
+HEADER_BYTES = len(MAGIC) + 8
+
+
+def _header():
+    return MAGIC + np.array([RECORD_DTYPE.itemsize, MAX_HANDS], dtype="<u4").tobytes()
+
+
+class TraceRecorder:
+    """frame_hook that appends every TrackedFrame a mode consumed to a trace file"""
+
+    def __init__(self, path, flush_every=30):
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "rb") as f:
+                if f.read(HEADER_BYTES) != _header():
+                    raise ValueError(f"Not a landmark trace with this layout: {path}")
+        self.file = open(path, "ab")
+        if not exists:
+            self.file.write(_header())
+        else:
+            # Drop a record torn by a session that crashed mid-write
+            size = os.path.getsize(path)
+            whole = HEADER_BYTES + (size - HEADER_BYTES) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+            if whole != size:
+                self.file.truncate(whole)
+        self.record = np.zeros(1, dtype=RECORD_DTYPE)
+        self.flush_every = flush_every
+        self.count = 0
+
+    def __call__(self, tracked):
+        self.write(tracked)
+        return True
+
+    def write(self, tracked):
+        record = self.record[0]
+        results = tracked.results
+        record["captured_at"] = tracked.captured_at
+        record["latency"] = tracked.clock() - tracked.captured_at
+        record["seq"] = tracked.seq
+        record["width"] = tracked.width
+        record["height"] = tracked.height
+        record["handedness"] = -1
+        record["score"] = 0
+        record["landmarks"] = 0
+
+        hands = (results.multi_hand_landmarks or [])[:MAX_HANDS]
+        handedness = results.multi_handedness or []
+        record["hand_count"] = len(hands)
+        for i, hand_landmarks in enumerate(hands):
+            record["landmarks"][i] = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+            if i < len(handedness):
+                classification = handedness[i].classification[0]
+                record["handedness"][i] = HANDEDNESS_CODES.get(classification.label, -1)
+                record["score"][i] = classification.score
+
+        self.file.write(self.record.tobytes())
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def open_trace(path):
+    """Memory-map a trace as a RECORD_DTYPE array"""
+    with open(path, "rb") as f:
+        if f.read(HEADER_BYTES) != _header():
+            raise ValueError(f"Not a landmark trace with this layout: {path}")
+    count = (os.path.getsize(path) - HEADER_BYTES) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_BYTES, shape=(count,))
+
+
+def results_from_record(record):
+    """HandResults shaped like (mirrored) MediaPipe output for one trace record"""
+    count = int(record["hand_count"])
+    if not count:
+        return HandResults()
+    hands = []
+    handedness = []
+    for i in range(count):
+        hands.append(HandLandmarks([Landmark(x, y, z) for x, y, z in record["landmarks"][i].tolist()]))
+        label = HANDEDNESS_LABELS.get(int(record["handedness"][i]))
+        handedness.append(Handedness([Classification(label, float(record["score"][i]), i)]))
+    return HandResults(hands, handedness)
+
+
+class ReplayPipeline:
+    """Stands in for HandTrackingPipeline, handing out TrackedFrames from a trace
+
+    With speed=None frames come as fast as the modes take them; otherwise they are
+    paced at speed times the recorded rate. Each frame's clock() returns the time
+    the frame was originally processed, so time-based gesture logic (click
+    cooldowns, cursor filters) sees the recorded timing at any replay speed.
+    Frames are blank; draw on them only to check overlays.
+    """
+
+    def __init__(self, records, speed=None):
+        self.records = records
+        self.speed = speed
+        self.index = 0
+        self.running = False
+        self.blank = None
+        self.started_at = None
+        self.now = 0.0
+
+    def start(self):
+        self.running = len(self.records) > 0
+        return self
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def stop(self):
+        self.running = False
+
+    def clock(self):
+        return self.now
+
+    def next_frame(self, timeout=1.0):
+        if not self.running or self.index >= len(self.records):
+            self.running = False
+            return None
+        record = self.records[self.index]
+        self.index += 1
+
+        captured_at = float(record["captured_at"])
+        if self.speed:
+            if self.started_at is None:
+                self.started_at = (time.perf_counter(), captured_at)
+            delay = self.started_at[0] + (captured_at - self.started_at[1]) / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        size = (int(record["width"]), int(record["height"]))
+        if self.blank is None or self.blank.shape[:2] != (size[1], size[0]):
+            self.blank = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        tracked = TrackedFrame(int(record["seq"]), captured_at, self.blank, results_from_record(record), size)
+        self.now = captured_at + float(record["latency"])
+        tracked.processed_at = self.now
+        tracked.clock = self.clock
+        return tracked
+
+
+def cursor_rows(records, screen_size):
+    """(t, x, y) of the first hand's index fingertip in screen pixels, as filter_eval reads them"""
+    from gesture_features import INDEX_TIP
+    tracked = records[records["hand_count"] > 0]
+    points = tracked["landmarks"][:, 0, INDEX_TIP, :2]
+    return np.column_stack([tracked["captured_at"], points[:, 0] * screen_size[0], points[:, 1] * screen_size[1]])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or convert landmark traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="summarize traces")
+    info.add_argument("traces", nargs="+")
+    cursor = commands.add_parser("cursor", help="write the raw cursor target as a t,x,y CSV for filter_eval.py")
+    cursor.add_argument("trace")
+    cursor.add_argument("output")
+    cursor.add_argument("--screen", default="1920x1080", help="screen size the cursor maps to, WIDTHxHEIGHT")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        for path in args.traces:
+            records = open_trace(path)
+            if not len(records):
+                print(f"{path}: empty")
+                continue
+            duration = float(records["captured_at"][-1] - records["captured_at"][0])
+            with_hands = int(np.count_nonzero(records["hand_count"]))
+            print(f"{path}: {len(records)} frames over {duration:.1f} s, {with_hands} with a hand, "
+                  f"latency p50 {np.percentile(records['latency'], 50) * 1000:.1f} ms, "
+                  f"{os.path.getsize(path) / 1e6:.1f} MB")
+    else:
+        screen_size = [int(v) for v in args.screen.lower().split("x")]
+        rows = cursor_rows(open_trace(args.trace), screen_size)
+        with open(args.output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["t", "x", "y"])
+            writer.writerows(rows.tolist())
+        print(f"Wrote {len(rows)} cursor samples to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
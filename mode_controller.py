@@ -0,0 +1,174 @@
+import queue
+
+import cv2
+
+from stage_metrics import metrics
+
+
+class ControllerState:
+    """One mode of the session (menu, mouse, keyboard) driven by a ModeController
+
+    step() is called once per loop iteration with the newest TrackedFrame (None for
+    states that don't use the camera) and returns the frame to show, or None.
+    Annotations should only be drawn when controller.drawing is set.
+    """
+
+    title = ""
+    uses_camera = True
+
+    def enter(self, controller):
+        pass
+
+    def exit(self):
+        pass
+
+    def step(self, tracked):
+        return None
+
+    def on_key(self, key):
+        pass
+
+
+class ModeController:
+    """Single event loop that owns the camera pipeline and preview window for a session
+
+    Mode switches are events on a thread-safe queue, so any thread (the Tk menu,
+    a voice command, a key press) can ask for one with switch_to(); the loop applies
+    it before the next frame. Nothing is re-created on a switch and the stack never
+    grows, unlike modes that call each other.
+
+    The pipeline comes from pipeline_factory the first time a camera mode is
+    entered, so a session that starts in the menu doesn't wait for the camera.
+
+    Pressing "m" in the preview window toggles a per-stage timing overlay.
+
+    headless runs without a window and without drawing. A preview publisher (see
+    shared_preview) then gets an annotated frame only as often as it asks for one.
+    """
+
+    def __init__(self, pipeline_factory, window_name="Hand Gesture Controller", headless=False,
+                 show_metrics=False, preview=None):
+        self.pipeline_factory = pipeline_factory
+        self.pipeline = None
+        self.window_name = window_name
+        self.headless = headless
+        self.states = {}
+        self.state = None
+        self.state_name = None
+        self.events = queue.Queue()
+        self.running = False
+        self.window_open = False
+        self.show_metrics = show_metrics
+        self.preview = preview
+        self.drawing = not headless
+
+    def add_state(self, name, state):
+        self.states[name] = state
+
+    def switch_to(self, name):
+        """Thread-safe request to change mode"""
+        self.events.put(("switch", name))
+
+    def quit(self):
+        self.events.put(("quit", None))
+
+    def _handle_events(self):
+        while True:
+            try:
+                kind, value = self.events.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "quit":
+                self.running = False
+                return
+            if kind == "switch":
+                self._enter(value)
+
+    def _enter(self, name):
+        if name == self.state_name or name not in self.states:
+            return
+        if self.state:
+            self.state.exit()
+        self.state_name = name
+        self.state = self.states[name]
+
+        if self.state.uses_camera:
+            if self.pipeline is None:
+                self.pipeline = self.pipeline_factory().start()
+            self.pipeline.resume()
+            if self.window_open:
+                cv2.setWindowTitle(self.window_name, self.state.title)
+        else:
+            # The camera keeps running (no re-open later), but inference stops
+            if self.pipeline is not None:
+                self.pipeline.pause()
+            if self.window_open:
+                cv2.destroyWindow(self.window_name)
+                self.window_open = False
+        self.state.enter(self)
+
+    def run(self, initial, frame_hook=None):
+        """Run until quit() or the camera ends
+
+        frame_hook, if given, is called with every TrackedFrame a state consumed and
+        ends the session by returning False.
+        """
+        self.running = True
+        self._enter(initial)
+        try:
+            while self.running:
+                self._handle_events()
+                if not self.running:
+                    break
+
+                tracked = None
+                if self.headless:
+                    self.drawing = self.preview is not None and self.preview.due()
+                if self.state.uses_camera:
+                    tracked = self.pipeline.next_frame(timeout=0.1)
+                    if tracked is None:
+                        if not self.pipeline.running:
+                            break
+                        continue
+
+                try:
+                    with metrics.time("mode_step"):
+                        frame = self.state.step(tracked)
+
+                    if tracked is not None and frame_hook is not None and frame_hook(tracked) is False:
+                        break
+
+                    if frame is not None and self.drawing:
+                        self._show(frame)
+                finally:
+                    # The frame's buffers go back to the pipeline for the next capture
+                    if tracked is not None:
+                        tracked.release()
+        finally:
+            self.running = False
+            if self.state:
+                self.state.exit()
+            self.state = self.state_name = None
+            if self.pipeline is not None:
+                self.pipeline.stop()
+                self.pipeline = None
+            if not self.headless:
+                cv2.destroyAllWindows()
+                self.window_open = False
+
+    def _show(self, frame):
+        if self.show_metrics:
+            metrics.draw_overlay(frame)
+        if self.headless:
+            self.preview.publish(frame)
+            return
+        with metrics.time("display"):
+            cv2.imshow(self.window_name, frame)
+            if not self.window_open:
+                cv2.setWindowTitle(self.window_name, self.state.title)
+                self.window_open = True
+            key = cv2.waitKey(1)
+        if key == ord("m"):
+            self.show_metrics = not self.show_metrics
+        elif key != -1:
+            self.state.on_key(key)
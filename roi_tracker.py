@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+from frame_pipeline import ScratchBuffer
+
+
+class RoiHandTracker:
+    """Runs hand tracking on a crop around the last known hand instead of the full frame
+
+    Wraps a mediapipe Hands instance and exposes the same process(rgb) call. Once a
+    hand has been found, the next frame is cropped to the hand's bounding box plus a
+    margin, optionally downscaled so its longest side is input_size pixels, and the
+    landmarks are mapped back to full-frame normalized coordinates before returning.
+    When the hand is lost in the crop, the same frame is re-run at full size.
+    """
+
+    def __init__(self, hands, margin=0.35, input_size=None, min_size=160):
+        self.hands = hands
+        self.margin = margin
+        self.input_size = input_size
+        self.min_size = min_size
+        self.roi = None
+        self.roi_frames = 0
+        self.full_frames = 0
+        # The crop handed to hands.process is rebuilt in the same memory every frame
+        self.crop_buffer = ScratchBuffer()
+
+    def reset(self):
+        self.roi = None
+
+    def process(self, rgb):
+        frame_height, frame_width = rgb.shape[:2]
+
+        if self.roi is not None:
+            results = self._process_roi(rgb, frame_width, frame_height)
+            if results.multi_hand_landmarks:
+                self.roi_frames += 1
+                self._update_roi(results, frame_width, frame_height)
+                return results
+            # Tracking lost inside the crop, search the whole frame
+            self.roi = None
+
+        self.full_frames += 1
+        results = self.hands.process(rgb)
+        self._update_roi(results, frame_width, frame_height)
+        return results
+
+    def _process_roi(self, rgb, frame_width, frame_height):
+        x0, y0, x1, y1 = self.roi
+        crop = rgb[y0:y1, x0:x1]
+        crop_width, crop_height = x1 - x0, y1 - y0
+
+        if self.input_size and max(crop_width, crop_height) > self.input_size:
+            scale = self.input_size / max(crop_width, crop_height)
+            size = (max(int(crop_width * scale), 1), max(int(crop_height * scale), 1))
+            resized = self.crop_buffer.view((size[1], size[0], 3))
+            cv2.resize(crop, size, dst=resized, interpolation=cv2.INTER_AREA)
+            crop = resized
+        else:
+            contiguous = self.crop_buffer.view(crop.shape)
+            np.copyto(contiguous, crop)
+            crop = contiguous
+        crop.flags.writeable = False
+
+        results = self.hands.process(crop)
+
+        # Landmarks come back normalized to the crop; the scale is uniform so x, y and z map linearly
+        for hand_landmarks in results.multi_hand_landmarks or []:
+            for lm in hand_landmarks.landmark:
+                lm.x = (x0 + lm.x * crop_width) / frame_width
+                lm.y = (y0 + lm.y * crop_height) / frame_height
+                lm.z = lm.z * crop_width / frame_width
+        return results
+
+    def _update_roi(self, results, frame_width, frame_height):
+        if not results.multi_hand_landmarks:
+            self.roi = None
+            return
+
+        xs = [lm.x * frame_width for lm in results.multi_hand_landmarks[0].landmark]
+        ys = [lm.y * frame_height for lm in results.multi_hand_landmarks[0].landmark]
+        center_x = (min(xs) + max(xs)) / 2
+        center_y = (min(ys) + max(ys)) / 2
+
+        # Square box so fast moves in either direction stay inside the margin
+        side = max(max(xs) - min(xs), max(ys) - min(ys)) * (1 + 2 * self.margin)
+        side = max(side, self.min_size)
+        half = side / 2
+
+        x0 = int(max(center_x - half, 0))
+        y0 = int(max(center_y - half, 0))
+        x1 = int(min(center_x + half, frame_width))
+        y1 = int(min(center_y + half, frame_height))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            self.roi = None
+            return
+        self.roi = (x0, y0, x1, y1)
@@ -0,0 +1,134 @@
+"""Out-of-process preview for headless sessions
+
+The controller publishes annotated frames, downscaled and at a reduced rate, into a
+shared-memory block; a separate viewer process shows them. Rendering the preview
+window then never holds up gesture control:
+
+    python MouseKeyborad.py --headless mouse --preview
+    python shared_preview.py
+"""
+
+import argparse
+import sys
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+DEFAULT_NAME = "gesturevoice_preview"
+# seq, width, height, published_at (ms); seq is odd while a frame is being written
+HEADER_FIELDS = 4
+HEADER_BYTES = HEADER_FIELDS * 8
+
+
+class SharedFramePublisher:
+    """Writes frames into a named shared-memory block at most fps times a second"""
+
+    def __init__(self, name=DEFAULT_NAME, width=640, height=360, fps=10):
+        self.width = width
+        self.height = height
+        self.interval = 1.0 / fps if fps else 0.0
+        self.last_publish = 0.0
+        size = HEADER_BYTES + width * height * 3
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a session that crashed
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        self.pixels = np.ndarray((height, width, 3), dtype=np.uint8, buffer=self.shm.buf, offset=HEADER_BYTES)
+        self.header[:] = 0
+
+    def due(self):
+        """Whether the next frame would be published, so callers can skip drawing otherwise"""
+        return time.time() - self.last_publish >= self.interval
+
+    def publish(self, frame):
+        self.last_publish = time.time()
+        frame_height, frame_width = frame.shape[:2]
+        scale = min(self.width / frame_width, self.height / frame_height, 1.0)
+        width, height = int(frame_width * scale), int(frame_height * scale)
+
+        self.header[0] += 1
+        if scale < 1.0:
+            cv2.resize(frame, (width, height), dst=self.pixels[:height, :width], interpolation=cv2.INTER_AREA)
+        else:
+            self.pixels[:height, :width] = frame
+        self.header[1:] = (width, height, int(self.last_publish * 1000))
+        self.header[0] += 1
+
+    def close(self):
+        self.header = self.pixels = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedFrameReader:
+    """Reads the newest frame from a SharedFramePublisher in another process"""
+
+    def __init__(self, name=DEFAULT_NAME):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the block, and exiting would unlink it
+            from multiprocessing import resource_tracker
+            self.shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        pixels = (self.shm.size - HEADER_BYTES) // 3
+        self.buffer = np.ndarray((pixels * 3,), dtype=np.uint8, buffer=self.shm.buf, offset=HEADER_BYTES)
+        self.last_seq = 0
+
+    def read(self):
+        """(frame, published_at) for a frame newer than the last one read, else None"""
+        seq = int(self.header[0])
+        if seq == self.last_seq or seq % 2:
+            return None
+        width, height, published_at = (int(v) for v in self.header[1:])
+        frame = self.buffer[:height * width * 3].reshape(height, width, 3).copy()
+        # A publish that started meanwhile may have torn the copy; try again next time
+        if int(self.header[0]) != seq:
+            return None
+        self.last_seq = seq
+        return frame, published_at / 1000
+
+    def close(self):
+        self.header = self.buffer = None
+        self.shm.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the preview of a headless gesture session")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="shared memory block to read")
+    args = parser.parse_args(argv)
+
+    reader = None
+    while reader is None:
+        try:
+            reader = SharedFrameReader(args.name)
+        except FileNotFoundError:
+            print("Waiting for a headless session with --preview...")
+            time.sleep(1)
+
+    try:
+        while True:
+            item = reader.read()
+            if item is not None:
+                frame, published_at = item
+                age_ms = (time.time() - published_at) * 1000
+                cv2.putText(frame, f"{age_ms:.0f} ms", (10, 20), cv2.FONT_HERSHEY_PLAIN, 1.2, (0, 255, 255), 1)
+                cv2.imshow("Gesture Preview", frame)
+            if cv2.waitKey(15) == 27:
+                break
+    finally:
+        reader.close()
+        cv2.destroyAllWindows()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
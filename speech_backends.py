@@ -0,0 +1,184 @@
+"""Speech recognition backends shared by voice commands and dictation
+
+GoogleBackend is the original online recognizer. VoskBackend runs fully offline
+and streams: partial hypotheses are available while the user is still speaking,
+so short commands can fire before the phrase is finished. SphinxBackend is an
+offline, non-streaming fallback through SpeechRecognition's pocketsphinx support.
+
+    python speech_backends.py --backend vosk --model models/vosk-model-small-en-us fixture.wav
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import wave
+
+import speech_recognition as sr
+
+try:
+    import vosk
+except ImportError:
+    vosk = None
+
+DEFAULT_VOSK_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "vosk-model-small-en-us")
+
+
+class RecognizerBackend:
+    """Base class: transcribe() turns a complete sr.AudioData into text
+
+    Streaming backends also implement stream(sample_rate), returning a session whose
+    accept(chunk) takes raw 16-bit mono PCM and returns (partial, final); final is
+    None until the recognizer decides the utterance has ended.
+    """
+
+    name = "base"
+    streaming = False
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+    def stream(self, sample_rate):
+        raise NotImplementedError(f"{self.name} backend does not stream")
+
+
+class GoogleBackend(RecognizerBackend):
+    name = "google"
+
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+
+class SphinxBackend(RecognizerBackend):
+    name = "sphinx"
+
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_sphinx(audio)
+
+
+class VoskStream:
+    """One streaming recognition session on a Vosk model"""
+
+    def __init__(self, model, sample_rate):
+        self.recognizer = vosk.KaldiRecognizer(model, sample_rate)
+        self.partial = ""
+
+    def accept(self, chunk):
+        if self.recognizer.AcceptWaveform(chunk):
+            final = json.loads(self.recognizer.Result()).get("text", "")
+            self.partial = ""
+            return "", final
+        self.partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return self.partial, None
+
+    def finish(self):
+        """Flush whatever audio is buffered and return the last final text"""
+        self.partial = ""
+        return json.loads(self.recognizer.FinalResult()).get("text", "")
+
+    def reset(self):
+        self.recognizer.Reset()
+        self.partial = ""
+
+
+class VoskBackend(RecognizerBackend):
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path=DEFAULT_VOSK_MODEL):
+        if vosk is None:
+            raise RuntimeError("The vosk backend needs the 'vosk' package (pip install vosk)")
+        if not os.path.isdir(model_path):
+            raise RuntimeError(f"Vosk model not found at {model_path}")
+        vosk.SetLogLevel(-1)
+        self.model = vosk.Model(model_path)
+
+    def stream(self, sample_rate):
+        return VoskStream(self.model, sample_rate)
+
+    def transcribe(self, audio):
+        session = self.stream(audio.sample_rate)
+        session.accept(audio.get_raw_data(convert_width=2))
+        text = session.finish()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+def make_backend(name=None, recognizer=None, model_path=DEFAULT_VOSK_MODEL):
+    """Build a backend by name; with no name, prefer offline Vosk when it is installed"""
+    if name is None:
+        name = "vosk" if vosk is not None and os.path.isdir(model_path) else "google"
+    if name == "google":
+        return GoogleBackend(recognizer)
+    if name == "sphinx":
+        return SphinxBackend(recognizer)
+    if name == "vosk":
+        return VoskBackend(model_path)
+    raise ValueError(f"Unknown speech backend: {name}")
+
+
+def transcribe_wav(backend, path, chunk_ms=100):
+    """Run a WAV file (16-bit mono PCM) through a backend as if it were live audio
+
+    Returns (final_text, partials) where partials is a list of (audio_seconds, text)
+    showing when each partial hypothesis became available. Useful for fixtures.
+    """
+    if not backend.streaming:
+        with sr.AudioFile(path) as source:
+            audio = sr.Recognizer().record(source)
+        try:
+            return backend.transcribe(audio), []
+        except sr.UnknownValueError:
+            return "", []
+
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError("Streaming fixtures must be 16-bit mono WAV files")
+        sample_rate = wav.getframerate()
+        frames_per_chunk = max(int(sample_rate * chunk_ms / 1000), 1)
+        session = backend.stream(sample_rate)
+        partials, finals = [], []
+        position = 0
+        while True:
+            chunk = wav.readframes(frames_per_chunk)
+            if not chunk:
+                break
+            position += len(chunk) // 2
+            partial, final = session.accept(chunk)
+            if final:
+                finals.append(final)
+            elif partial and (not partials or partials[-1][1] != partial):
+                partials.append((position / sample_rate, partial))
+        last = session.finish()
+        if last:
+            finals.append(last)
+    return " ".join(finals), partials
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe WAV fixtures with a speech backend")
+    parser.add_argument("wavs", nargs="+")
+    parser.add_argument("--backend", choices=["google", "sphinx", "vosk"])
+    parser.add_argument("--model", default=DEFAULT_VOSK_MODEL, help="Vosk model directory")
+    args = parser.parse_args(argv)
+
+    backend = make_backend(args.backend, model_path=args.model)
+    for path in args.wavs:
+        start = time.perf_counter()
+        text, partials = transcribe_wav(backend, path)
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {text!r} ({elapsed * 1000:.0f} ms, backend={backend.name})")
+        for at, partial in partials:
+            print(f"  {at:6.2f}s  {partial}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+# Upper bounds (ms) of the cumulative buckets exported to Prometheus
+BUCKETS_MS = (1, 2, 5, 10, 20, 33, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class RollingHistogram:
+    """Last `size` durations of one stage, plus all-time bucket counts
+
+    Percentiles come from the rolling window, so they follow what the machine is
+    doing now; the buckets, count and sum never reset, as Prometheus expects.
+    """
+
+    def __init__(self, size=512):
+        self.samples = np.zeros(size)
+        self.size = size
+        self.count = 0
+        self.total = 0.0
+        self.buckets = np.zeros(len(BUCKETS_MS) + 1, dtype=np.int64)
+
+    def add(self, ms):
+        self.samples[self.count % self.size] = ms
+        self.count += 1
+        self.total += ms
+        self.buckets[np.searchsorted(BUCKETS_MS, ms)] += 1
+
+    def window(self):
+        return self.samples[:min(self.count, self.size)]
+
+    def summary(self):
+        window = self.window()
+        if not len(window):
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(window, [50, 95, 99])
+        return {"count": self.count, "mean": round(float(window.mean()), 3), "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3), "p99": round(float(p99), 3), "max": round(float(window.max()), 3)}
+
+
+class StageMetrics:
+    """Timing histograms for the named stages of the camera and voice pipelines
+
+    Stages are recorded from whichever thread runs them, with time() around a block
+    or record() with a duration measured elsewhere. Setting enabled to False turns
+    both into no-ops.
+    """
+
+    def __init__(self, window=512):
+        self.window = window
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.enabled = True
+        self.started_at = time.time()
+        self.dumper = None
+        self.server = None
+
+    def record(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = RollingHistogram(self.window)
+            histogram.add(seconds * 1000)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """{stage: {count, mean, p50, p95, p99, max}} with durations in ms"""
+        with self.lock:
+            return {stage: histogram.summary() for stage, histogram in sorted(self.histograms.items())}
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump({"time": time.time(), "stages": self.snapshot()}, f, indent=2)
+
+    def write_csv(self, path):
+        """Append one row per stage, so repeated dumps build up a time series"""
+        fields = ["time", "stage", "count", "mean", "p50", "p95", "p99", "max"]
+        now = round(time.time(), 3)
+        new_file = not (os.path.exists(path) and os.path.getsize(path) > 0)
+        with open(path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            if new_file:
+                writer.writeheader()
+            for stage, summary in self.snapshot().items():
+                writer.writerow({"time": now, "stage": stage, **summary})
+
+    def prometheus_text(self):
+        lines = ["# HELP gesturevoice_stage_ms Time spent per pipeline stage in milliseconds",
+                 "# TYPE gesturevoice_stage_ms histogram"]
+        with self.lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = np.cumsum(histogram.buckets)
+                for bound, count in zip(BUCKETS_MS, cumulative):
+                    lines.append(f'gesturevoice_stage_ms_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'gesturevoice_stage_ms_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'gesturevoice_stage_ms_sum{{stage="{stage}"}} {histogram.total:.3f}')
+                lines.append(f'gesturevoice_stage_ms_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def start_dump(self, path, interval=10):
+        """Write a snapshot to path every interval seconds (.csv appends, anything else is JSON)"""
+        def run():
+            while self.dumper is not None:
+                time.sleep(interval)
+                try:
+                    if path.endswith(".csv"):
+                        self.write_csv(path)
+                    else:
+                        self.write_json(path)
+                except OSError as e:
+                    print(f"Could not write metrics to {path}: {e}")
+        self.dumper = threading.Thread(target=run, daemon=True)
+        self.dumper.start()
+
+    def serve(self, port=9464, host="127.0.0.1"):
+        """Serve prometheus_text() at http://host:port/metrics from a background thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+    def stop(self):
+        self.dumper = None
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
+
+    def draw_overlay(self, frame, origin=(20, 500)):
+        """Draw p50/p95 per stage onto frame"""
+        x, y = origin
+        cv2.putText(frame, "stage        p50     p95 ms", (x, y), cv2.FONT_HERSHEY_PLAIN, 1.2, (0, 255, 255), 1)
+        for stage, summary in self.snapshot().items():
+            if not summary["count"]:
+                continue
+            y += 20
+            cv2.putText(frame, f"{stage:<12} {summary['p50']:6.1f}  {summary['p95']:6.1f}", (x, y),
+                        cv2.FONT_HERSHEY_PLAIN, 1.2, (0, 255, 255), 1)
+        return frame
+
+
+# Shared by every module, so one overlay/dump covers camera, input and voice stages
+metrics = StageMetrics()
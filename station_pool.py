@@ -0,0 +1,314 @@
+"""Run several cameras (stations) on one machine, one process per camera
+
+Each worker process owns one capture source and its own hand detector, so
+inference on different cameras runs on different cores without sharing a GIL.
+Workers send small landmark packets back over a queue; a single consumer in the
+parent maps them to actions. Sources may be camera indexes or video files:
+
+    python station_pool.py 0 1
+    python station_pool.py tests/left.mp4 tests/right.mp4 --hands 2 --seconds 10
+    python station_pool.py 0 --mouse 0
+"""
+
+import argparse
+import multiprocessing
+import queue
+import sys
+import time
+
+import numpy as np
+
+from gesture_features import HandFeatures, INDEX_TIP
+
+
+class HandPacket:
+    """One detected hand: handedness label and (21, 3) normalized, mirrored landmarks"""
+
+    def __init__(self, label, landmarks):
+        self.label = label
+        self.landmarks = landmarks
+
+
+class LandmarkPacket:
+    """Everything a worker found in one frame; ended is set on the worker's last packet"""
+
+    def __init__(self, station, seq, captured_at, processed_at, frame_size, hands, detector=None,
+                 ended=False, error=None):
+        self.station = station
+        self.seq = seq
+        self.captured_at = captured_at
+        self.processed_at = processed_at
+        self.frame_size = frame_size
+        self.hands = hands
+        self.detector = detector
+        self.ended = ended
+        self.error = error
+
+
+def _open_source(source):
+    import cv2
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    if not capture.isOpened():
+        raise IOError(f"Could not open capture source: {source}")
+    return capture
+
+
+def capture_worker(station, source, packets, stop, max_num_hands=1, detector="auto", budget_ms=20.0,
+                   realtime=True):
+    """Process entry point: read source, track hands, put a LandmarkPacket per frame on packets"""
+    import cv2
+    from frame_pipeline import mirror_results
+    from hand_detectors import AdaptiveDetector, default_detector_factories
+
+    seq = 0
+    try:
+        capture = _open_source(source)
+        is_file = not str(source).isdigit()
+        interval = 1.0 / (capture.get(cv2.CAP_PROP_FPS) or 30) if is_file and realtime else 0
+        factories = default_detector_factories(max_num_hands=max_num_hands)
+        if detector != "auto":
+            factories = [(name, factory) for name, factory in factories if name == detector]
+        hands = AdaptiveDetector(factories, budget_ms)
+        # Pick the detector that fits the budget up front, like the app does, instead of
+        # starting on the most accurate one and stepping down only after a window over budget
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)) or 640
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 480
+        hands.select(np.zeros((height, width, 3), dtype=np.uint8))
+        frame = rgb = None
+        next_time = time.perf_counter()
+
+        while not stop.is_set():
+            if interval:
+                # Play files at their own frame rate, like a live camera would deliver them
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_time += interval
+            success, frame = capture.read(frame)
+            if not success:
+                break
+            captured_at = time.time()
+            seq += 1
+
+            if rgb is None or rgb.shape != frame.shape:
+                rgb = np.empty_like(frame)
+            rgb.flags.writeable = True
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+            rgb.flags.writeable = False
+            results = hands.process(rgb)
+            mirror_results(results)
+
+            labels = [h.classification[0].label for h in results.multi_handedness or []]
+            found = []
+            for i, hand_landmarks in enumerate(results.multi_hand_landmarks or []):
+                landmarks = np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], dtype=np.float32)
+                found.append(HandPacket(labels[i] if i < len(labels) else None, landmarks))
+
+            packet = LandmarkPacket(station, seq, captured_at, time.time(), (frame.shape[1], frame.shape[0]),
+                                    found, hands.name)
+            try:
+                packets.put_nowait(packet)
+            except queue.Full:
+                # The consumer is behind; it only cares about the newest landmarks anyway
+                pass
+        capture.release()
+        packets.put(LandmarkPacket(station, seq, time.time(), time.time(), None, [], ended=True))
+    except Exception as e:
+        packets.put(LandmarkPacket(station, seq, time.time(), time.time(), None, [], ended=True, error=repr(e)))
+
+
+class StationSupervisor:
+    """Starts one capture_worker process per source and collects their packets
+
+    A worker that dies without saying it has ended (a crash, a killed process) is
+    restarted up to max_restarts times. Processes are started with "spawn", so
+    workers never inherit OpenCV or MediaPipe threads from the parent.
+    """
+
+    def __init__(self, sources, max_num_hands=1, detector="auto", budget_ms=20.0, realtime=True,
+                 max_restarts=3, queue_size=256):
+        self.sources = list(sources)
+        self.worker_options = {"max_num_hands": max_num_hands, "detector": detector,
+                               "budget_ms": budget_ms, "realtime": realtime}
+        self.max_restarts = max_restarts
+        self.context = multiprocessing.get_context("spawn")
+        self.packets = self.context.Queue(queue_size)
+        self.stop_event = self.context.Event()
+        self.processes = {}
+        self.restarts = {}
+        self.ended = set()
+        self.latest = {}
+        self.last_check = 0.0
+
+    def _spawn(self, station):
+        process = self.context.Process(target=capture_worker, name=f"station-{station}", daemon=True,
+                                       args=(station, self.sources[station], self.packets, self.stop_event),
+                                       kwargs=self.worker_options)
+        process.start()
+        self.processes[station] = process
+
+    def start(self):
+        self.stop_event.clear()
+        for station in range(len(self.sources)):
+            self.restarts[station] = 0
+            self._spawn(station)
+        return self
+
+    @property
+    def running(self):
+        return len(self.ended) < len(self.sources)
+
+    def _supervise(self):
+        for station, process in self.processes.items():
+            # Workers that finish normally exit with 0 after sending their ended packet
+            if station in self.ended or process.is_alive() or process.exitcode == 0:
+                continue
+            if self.restarts[station] >= self.max_restarts:
+                print(f"Station {station} stopped after {self.restarts[station]} restarts")
+                self.ended.add(station)
+                continue
+            self.restarts[station] += 1
+            print(f"Station {station} exited unexpectedly (code {process.exitcode}), restarting")
+            self._spawn(station)
+
+    def next_packet(self, timeout=0.5):
+        """The next packet from any station, or None on timeout"""
+        # Other stations keep the queue busy, so check for dead workers on a clock
+        if time.time() - self.last_check > 1.0:
+            self.last_check = time.time()
+            self._supervise()
+        try:
+            packet = self.packets.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if packet.ended:
+            self.ended.add(packet.station)
+            if packet.error:
+                print(f"Station {packet.station} failed: {packet.error}")
+        else:
+            self.latest[packet.station] = packet
+        return packet
+
+    def run(self, handler, duration=None):
+        """Call handler(packet) for every packet until all stations end, stop(), or duration"""
+        deadline = time.time() + duration if duration else None
+        while self.running and not self.stop_event.is_set():
+            if deadline and time.time() > deadline:
+                break
+            packet = self.next_packet()
+            if packet is not None and not packet.ended:
+                handler(packet)
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        for process in self.processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = {}
+
+
+class LandmarkRouter:
+    """Single consumer that maps each (station, hand) stream to its own action
+
+    bind(station, action, hand="Left") routes one hand of a station; without hand
+    it takes every hand of that station that has no route of its own. Each route
+    keeps its own HandFeatures, and action(packet, hand, features) is called with
+    features already updated in the station's pixel units.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.features = {}
+
+    def bind(self, station, action, hand=None):
+        self.routes[(station, hand)] = action
+
+    def __call__(self, packet):
+        for hand in packet.hands:
+            key = (packet.station, hand.label)
+            if key not in self.routes:
+                key = (packet.station, None)
+            action = self.routes.get(key)
+            if action is None:
+                continue
+            features = self.features.setdefault(key, HandFeatures())
+            features.update_array(hand.landmarks, *packet.frame_size)
+            action(packet, hand, features)
+
+
+class StationStats:
+    """Handler that counts packets, hands and latency per station"""
+
+    def __init__(self):
+        self.frames = {}
+        self.hands = {}
+        self.latencies = {}
+        self.detectors = {}
+
+    def __call__(self, packet):
+        station = packet.station
+        self.frames[station] = self.frames.get(station, 0) + 1
+        self.hands[station] = self.hands.get(station, 0) + len(packet.hands)
+        self.latencies.setdefault(station, []).append((time.time() - packet.captured_at) * 1000)
+        self.detectors[station] = packet.detector
+
+    def report(self, elapsed):
+        lines = []
+        for station in sorted(self.frames):
+            latencies = np.array(self.latencies[station])
+            lines.append(f"station {station}: {self.frames[station] / elapsed:5.1f} fps, "
+                         f"{self.hands[station]} hands, latency p50 {np.percentile(latencies, 50):.1f} ms "
+                         f"p95 {np.percentile(latencies, 95):.1f} ms, detector {self.detectors[station]}")
+        return "\n".join(lines)
+
+
+def cursor_action(screen_size, injector):
+    """Route action that moves the mouse with the index fingertip"""
+    def move(packet, hand, features):
+        x, y = hand.landmarks[INDEX_TIP, :2]
+        injector.move_to(x * screen_size[0], y * screen_size[1])
+    return move
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Track hands on several cameras, one process per camera")
+    parser.add_argument("sources", nargs="+", help="camera indexes or video files")
+    parser.add_argument("--hands", type=int, default=1, help="hands to track per camera")
+    parser.add_argument("--detector", default="auto", help="auto, mediapipe_full, mediapipe_lite or contour")
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="per-frame detection budget for auto")
+    parser.add_argument("--seconds", type=float, help="stop after this long")
+    parser.add_argument("--as-fast-as-possible", action="store_true", help="don't pace video files")
+    parser.add_argument("--mouse", type=int, metavar="STATION", help="move the cursor with this station's hand")
+    args = parser.parse_args(argv)
+
+    stats = StationStats()
+    router = LandmarkRouter()
+    injector = None
+    if args.mouse is not None:
+        import pyautogui
+        from input_injector import InputInjector
+        injector = InputInjector(pyautogui, None).start()
+        router.bind(args.mouse, cursor_action(pyautogui.size(), injector))
+
+    def handle(packet):
+        stats(packet)
+        router(packet)
+
+    supervisor = StationSupervisor(args.sources, max_num_hands=args.hands, detector=args.detector,
+                                   budget_ms=args.budget_ms, realtime=not args.as_fast_as_possible).start()
+    start = time.time()
+    try:
+        supervisor.run(handle, duration=args.seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+        if injector is not None:
+            injector.stop()
+    print(stats.report(time.time() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+from collections import deque
+
+
+class TextBuffer:
+    """Bounded editing buffer for the keyboard's on-screen text
+
+    Only the last `limit` characters are kept; everything typed has already been
+    sent to the focused app, so older text is only needed for display. len() still
+    counts every character typed since the last clear(), so backspace() keeps
+    succeeding for characters that are no longer held but are still in the app.
+    The joined string is cached until the next edit, and version lets callers skip
+    work when nothing has changed since they last looked.
+    """
+
+    def __init__(self, limit=256):
+        self.chars = deque(maxlen=limit)
+        self.length = 0
+        self.version = 0
+        self._text = ""
+        self._text_version = 0
+
+    def append(self, text):
+        if text:
+            self.chars.extend(text)
+            self.length += len(text)
+            self.version += 1
+
+    def backspace(self):
+        """Drop the last character; False if nothing has been typed since the last clear"""
+        if not self.length:
+            return False
+        if self.chars:
+            self.chars.pop()
+        self.length -= 1
+        self.version += 1
+        return True
+
+    def clear(self):
+        self.chars.clear()
+        self.length = 0
+        self.version += 1
+
+    @property
+    def text(self):
+        if self._text_version != self.version:
+            self._text = "".join(self.chars)
+            self._text_version = self.version
+        return self._text
+
+    def tail(self, count):
+        return self.text[-count:]
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return self.text
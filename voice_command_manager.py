@@ -7,9 +7,30 @@ import webbrowser
 import sys
 import os
 
+from speech_backends import make_backend
+from command_matcher import CommandMatcher
+from audio_capture import RecognitionPool
+from audio_hub import AudioHub
+from stage_metrics import metrics
+from action_executor import ActionExecutor
+
+# Seconds an action may take before it is reported as timed out; others get the executor default
+ACTION_TIMEOUTS = {
+    "screenshot": 5.0,
+    "open browser": 5.0,
+    "open notepad": 5.0,
+    "search for {query}": 5.0,
+    "lock computer": 5.0,
+    "sleep computer": 5.0,
+}
+
 class VoiceCommandManager:
-    def __init__(self):
+    def __init__(self, backend=None, command_tolerance="exact", audio_hub=None):
         self.recognizer = sr.Recognizer()
+        # Offline streaming Vosk when available, Google otherwise
+        self.backend = backend or make_backend(recognizer=self.recognizer)
+        # Microphone shared with dictation
+        self.audio_hub = audio_hub or AudioHub()
         self.listening = False
         self.status_message = ""
         self.command_thread = None
@@ -31,7 +52,7 @@ class VoiceCommandManager:
             "close window": self.close_current_window,
             
             # Browser specific
-            "search for": self.search_web,
+            "search for {query}": self.search_web,
             "go back": self.browser_back,
             "refresh page": self.refresh_page,
             
@@ -44,8 +65,21 @@ class VoiceCommandManager:
             "sleep computer": self.sleep_computer
         }
         
+        # All phrases compiled into one matcher; {query} style slots become keyword arguments
+        self.matcher = CommandMatcher(tolerance=command_tolerance)
+        for command, action in self.commands.items():
+            self.matcher.add(command, action)
+        
         # Command callback function for mode switching
         self.mode_switch_callback = None
+
+        # Actions run on their own threads so a slow one never holds up listening
+        self.executor = ActionExecutor(on_error=self._on_action_error)
+        
+    def register_command(self, command, action, priority=0):
+        """Add a command or user macro, e.g. register_command("type {text}", handler)"""
+        self.commands[command] = action
+        self.matcher.add(command, action, priority)
         
     def set_mode_switch_callback(self, callback):
         """Set callback function for mode switching"""
@@ -71,51 +105,98 @@ class VoiceCommandManager:
     
     def _listen_for_commands(self):
         """Background thread function to continuously listen for commands"""
-        with sr.Microphone() as source:
-            # Adjust for ambient noise once at the beginning
-            self.status_message = "Adjusting for ambient noise..."
-            self.recognizer.adjust_for_ambient_noise(source, duration=1)
-            
-            while self.continue_listening:
-                try:
-                    self.status_message = "Listening for commands..."
-                    audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=5)
-                    self.status_message = "Processing command..."
-                    
-                    # Use Google's speech recognition
-                    text = self.recognizer.recognize_google(audio).lower()
+        try:
+            if self.backend.streaming:
+                with self.audio_hub.subscribe("chunk") as chunks:
+                    self._stream_commands(chunks)
+                return
+
+            # The hub reads the microphone continuously into a ring buffer; utterances cut out
+            # by its VAD are recognized on worker threads while capture carries on
+            pool = RecognitionPool(self.backend, self._on_transcript, self._on_recognition_error)
+            listener = pool.submit
+            self.audio_hub.add_listener(listener)
+            self.status_message = "Listening for commands..."
+
+            while self.continue_listening and self.audio_hub.running:
+                time.sleep(0.1)
+
+            self.audio_hub.remove_listener(listener)
+            pool.shutdown()
+        except Exception as e:
+            self.status_message = f"Error: {str(e)}"
+
+    def _on_transcript(self, text, elapsed):
+        """Called by the recognition pool, in utterance order"""
+        text = text.lower()
+        self.status_message = f"Heard: {text}"
+        print(f"Command heard: {text} ({elapsed * 1000:.0f} ms)")
+        if not self._dispatch(text):
+            self.status_message = "Command not recognized"
+
+    def _on_recognition_error(self, error):
+        if isinstance(error, sr.UnknownValueError):
+            self.status_message = "Could not understand audio"
+        elif isinstance(error, sr.RequestError):
+            self.status_message = "Could not request results"
+        else:
+            self.status_message = f"Error: {str(error)}"
+
+    def _stream_commands(self, chunks):
+        """Feed microphone chunks to a streaming backend and act on partial results
+
+        Commands without parameters fire as soon as they appear in the partial
+        hypothesis; the session is then reset so the rest of the phrase can't fire
+        them again. Commands with slots ("search for {query}") wait for the final text,
+        and so does any command spoken inside one ("search for mute").
+        """
+        session = self.backend.stream(self.audio_hub.sample_rate)
+        self.status_message = "Listening for commands..."
+        while self.continue_listening:
+            try:
+                chunk = chunks.get(timeout=0.5)
+                if chunk is None:
+                    continue
+                with metrics.time("recognition_chunk"):
+                    partial, final = session.accept(chunk)
+
+                if partial:
+                    self.status_message = f"Hearing: {partial}"
+                    if self._dispatch(partial.lower(), allow_parameters=False):
+                        print(f"Command heard: {partial}")
+                        session.reset()
+                elif final:
+                    text = final.lower()
                     self.status_message = f"Heard: {text}"
                     print(f"Command heard: {text}")
-                    
-                    # Check for direct command matches
-                    command_executed = False
-                    for command, action in self.commands.items():
-                        if command in text:
-                            # For commands that need parameters (like "search for")
-                            if command == "search for" and command in text:
-                                query = text.split("search for", 1)[1].strip()
-                                if query:
-                                    action(query)
-                                    command_executed = True
-                            else:
-                                action()
-                                command_executed = True
-                    
-                    if not command_executed:
+                    if not self._dispatch(text):
                         self.status_message = "Command not recognized"
-                    
-                    time.sleep(0.5)  # Small delay to prevent processing the same command multiple times
-                    
-                except sr.WaitTimeoutError:
-                    self.status_message = "Listening..."
-                except sr.UnknownValueError:
-                    self.status_message = "Could not understand audio"
-                except sr.RequestError:
-                    self.status_message = "Could not request results"
-                except Exception as e:
-                    self.status_message = f"Error: {str(e)}"
-                
-                time.sleep(0.1)  # Small delay to prevent high CPU usage
+            except Exception as e:
+                self.status_message = f"Error: {str(e)}"
+
+    def _dispatch(self, text, allow_parameters=True):
+        """Queue the single best command found in text; returns True if one was found"""
+        with metrics.time("command_match"):
+            # Slots are always matched, so a partial such as "search for mute" resolves to
+            # the longer "search for {query}" rather than firing "mute" on its own
+            match = self.matcher.match(text)
+        if match is None or (match.slots and not allow_parameters):
+            return False
+        self.executor.submit(match.command, match.action, match.slots, ACTION_TIMEOUTS.get(match.command))
+        return True
+
+    def _on_action_error(self, command, error):
+        """Called on an action thread when an action fails or runs past its timeout"""
+        if isinstance(error, TimeoutError):
+            self.status_message = f"'{command}' is taking too long"
+        else:
+            self.status_message = f"'{command}' failed: {error}"
+
+    def close(self):
+        """Stop listening and drop any actions that haven't started"""
+        if self.listening:
+            self.stop_listening()
+        self.executor.shutdown()
     
     # Command action methods
     def scroll_up(self):
@@ -202,19 +283,21 @@ class VoiceCommandManager:
         self.status_message = "Switching to keyboard mode"
     
     def lock_computer(self):
+        timeout = ACTION_TIMEOUTS["lock computer"]
         if sys.platform == 'win32':
-            os.system('rundll32.exe user32.dll,LockWorkStation')
+            subprocess.run('rundll32.exe user32.dll,LockWorkStation', shell=True, timeout=timeout)
         elif sys.platform == 'darwin':  # macOS
-            subprocess.call(['pmset', 'displaysleepnow'])
+            subprocess.run(['pmset', 'displaysleepnow'], timeout=timeout)
         else:  # Linux
-            os.system('gnome-screensaver-command --lock')
+            subprocess.run('gnome-screensaver-command --lock', shell=True, timeout=timeout)
         self.status_message = "Computer locked"
     
     def sleep_computer(self):
+        timeout = ACTION_TIMEOUTS["sleep computer"]
         if sys.platform == 'win32':
-            os.system('rundll32.exe powrprof.dll,SetSuspendState 0,1,0')
+            subprocess.run('rundll32.exe powrprof.dll,SetSuspendState 0,1,0', shell=True, timeout=timeout)
         elif sys.platform == 'darwin':  # macOS
-            os.system('pmset sleepnow')
+            subprocess.run('pmset sleepnow', shell=True, timeout=timeout)
         else:  # Linux
-            os.system('systemctl suspend')
+            subprocess.run('systemctl suspend', shell=True, timeout=timeout)
         self.status_message = "Computer sleeping"
\ No newline at end of file
@@ -0,0 +1,95 @@
+import threading
+import time
+
+
+class _Task:
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.started = False
+        self.value = None
+        self.error = None
+        self.duration = None
+
+
+class WarmStart:
+    """Builds named startup resources lazily or ahead of time on background threads
+
+    add() registers a factory. start() runs every factory on its own thread so slow
+    resources (camera, hand model, speech) load in parallel while the UI is already
+    up; get() returns a resource, waiting for its background build or running the
+    factory right there if nobody has started it. Factories may get() each other.
+
+    mark() records named milestones (e.g. the first tracked frame) relative to when
+    this object was created, for report().
+    """
+
+    def __init__(self):
+        self.created_at = time.perf_counter()
+        self.tasks = {}
+        self.marks = {}
+        self.reported = False
+
+    def add(self, name, factory):
+        self.tasks[name] = _Task(name, factory)
+
+    def provide(self, name, value):
+        """Use an existing value instead of running the factory (e.g. a test video source)"""
+        task = self.tasks.setdefault(name, _Task(name, None))
+        with task.lock:
+            task.started = True
+            task.value = value
+            task.duration = 0.0
+            task.done.set()
+
+    def start(self, *names):
+        """Build the given resources (all of them by default) in the background"""
+        for name in names or list(self.tasks):
+            threading.Thread(target=self._build, args=(self.tasks[name],), daemon=True).start()
+        return self
+
+    def _build(self, task):
+        with task.lock:
+            if task.started:
+                return
+            task.started = True
+        began = time.perf_counter()
+        try:
+            task.value = task.factory()
+        except Exception as e:
+            task.error = e
+        task.duration = time.perf_counter() - began
+        task.done.set()
+
+    def get(self, name, timeout=None):
+        task = self.tasks[name]
+        self._build(task)  # no-op when a background build already claimed it
+        if not task.done.wait(timeout):
+            raise TimeoutError(f"{name} is still loading")
+        if task.error:
+            raise task.error
+        return task.value
+
+    def ready(self, name):
+        task = self.tasks.get(name)
+        return task is not None and task.done.is_set() and task.error is None
+
+    def pending(self):
+        return [name for name, task in self.tasks.items() if not task.done.is_set()]
+
+    def mark(self, label):
+        """Record the first time a milestone is reached"""
+        self.marks.setdefault(label, time.perf_counter() - self.created_at)
+
+    def report(self):
+        lines = ["Startup timings:"]
+        for name, task in self.tasks.items():
+            if task.error:
+                lines.append(f"  {name:<22} failed: {task.error}")
+            elif task.duration is not None:
+                lines.append(f"  {name:<22} {task.duration * 1000:8.0f} ms")
+        for label, at in sorted(self.marks.items(), key=lambda item: item[1]):
+            lines.append(f"  {label:<22} at {at * 1000:6.0f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,267 @@
+"""Word completion for the virtual keyboard
+
+A dictionary is a prefix trie flattened into one array of fixed-size nodes and
+stored on disk, so it is memory-mapped instead of parsed at startup. Every node
+knows the highest word frequency below it and its children are sorted by that,
+which lets a best-first search return the top completions of a prefix without
+visiting the rest of its subtree. Words the user types are counted in a small
+JSON file and blended into the ranking.
+
+    python word_predictor.py build wordlist.txt words.bin
+    python word_predictor.py query words.bin th
+"""
+
+import argparse
+import heapq
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+MAGIC = b"GVTRIE1\0"
+NODE_DTYPE = np.dtype([("first_child", "<u4"), ("child_count", "<u2"), ("char", "<u4"),
+                       ("freq", "<u4"), ("best", "<u4")])
+DEFAULT_USER_FILE = os.path.join(os.path.expanduser("~"), ".gesturevoice_words.json")
+WORD_RE = re.compile(r"[a-z']+$")
+
+# Fallback when no dictionary file is installed, most frequent first
+COMMON_WORDS = (
+    "the of and to a in is you that it he was for on are as with his they i at be this have from or one "
+    "had by word but not what all were we when your can said there use an each which she do how their if "
+    "will up other about out many then them these so some her would make like him into time has look two "
+    "more write go see number no way could people my than first water been call who oil its now find long "
+    "down day did get come made may part over new sound take only little work know place year live me back "
+    "give most very after thing our just name good sentence man think say great where help through much "
+    "before line right too mean old any same tell boy follow came want show also around form three small "
+    "set put end does another well large must big even such because turn here why ask went men read need "
+    "land different home us move try kind hand picture again change off play spell air away animal house "
+    "point page letter mother answer found study still learn should world hello thanks please open close "
+    "search mouse keyboard computer email message today tomorrow yes okay"
+).split()
+
+
+def build_nodes(word_freqs):
+    """Flatten {word: frequency} into a NODE_DTYPE array; node 0 is the root"""
+    root = {}
+    for word, freq in word_freqs.items():
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = node.get("", 0) + int(freq)
+
+    def best(node):
+        node_best = node.get("", 0)
+        for char, child in node.items():
+            if char:
+                node_best = max(node_best, best(child))
+        node["#"] = node_best
+        return node_best
+
+    best(root)
+    nodes = []
+
+    # Breadth-first, so each node's children end up next to each other
+    def emit(char, node):
+        nodes.append([0, 0, ord(char) if char else 0, node.get("", 0), node["#"]])
+        return len(nodes) - 1
+
+    queue = deque([(emit("", root), root)])
+    while queue:
+        index, node = queue.popleft()
+        children = sorted(((c, n) for c, n in node.items() if c not in ("", "#")), key=lambda item: -item[1]["#"])
+        nodes[index][0] = len(nodes)
+        nodes[index][1] = len(children)
+        for char, child in children:
+            queue.append((emit(char, child), child))
+
+    array = np.zeros(len(nodes), dtype=NODE_DTYPE)
+    for i, (first_child, child_count, char, freq, node_best) in enumerate(nodes):
+        array[i] = (first_child, child_count, char, min(freq, 2 ** 32 - 1), min(node_best, 2 ** 32 - 1))
+    return array
+
+
+def write_dictionary(word_freqs, path):
+    nodes = build_nodes(word_freqs)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint32(len(nodes)).tobytes())
+        f.write(nodes.tobytes())
+    return len(nodes)
+
+
+def read_word_list(path):
+    """Lines of "word" (ranked by order) or "word count"; returns {word: frequency}"""
+    words = {}
+    with open(path, encoding="utf-8") as f:
+        lines = [line.split() for line in f if line.strip()]
+    for rank, parts in enumerate(lines):
+        word = parts[0].lower()
+        freq = int(parts[1]) if len(parts) > 1 else len(lines) - rank
+        words[word] = words.get(word, 0) + freq
+    return words
+
+
+class TrieDictionary:
+    """Read-only completion trie over a NODE_DTYPE array (memory-mapped or in memory)"""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    @classmethod
+    def open(cls, path):
+        header = len(MAGIC) + 4
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a word dictionary: {path}")
+            count = int(np.frombuffer(f.read(4), dtype="<u4")[0])
+        return cls(np.memmap(path, dtype=NODE_DTYPE, mode="r", offset=header, shape=(count,)))
+
+    @classmethod
+    def from_words(cls, word_freqs):
+        return cls(build_nodes(word_freqs))
+
+    def find(self, prefix):
+        """Index of the node for prefix, or None"""
+        nodes = self.nodes
+        index = 0
+        for char in prefix:
+            code = ord(char)
+            first = int(nodes[index]["first_child"])
+            for child in range(first, first + int(nodes[index]["child_count"])):
+                if nodes[child]["char"] == code:
+                    index = child
+                    break
+            else:
+                return None
+        return index
+
+    def frequency(self, word):
+        index = self.find(word)
+        return int(self.nodes[index]["freq"]) if index is not None else 0
+
+    def complete(self, prefix, k=3):
+        """Up to k (word, frequency) completions of prefix, most frequent first"""
+        start = self.find(prefix)
+        if start is None:
+            return []
+        nodes = self.nodes
+        # Nodes are keyed by the best frequency below them, words by their own; a word
+        # popped before every remaining node can't be beaten by anything still queued
+        heap = [(-int(nodes[start]["best"]), 1, start, prefix)]
+        found = []
+        while heap and len(found) < k:
+            priority, is_node, index, text = heapq.heappop(heap)
+            if not is_node:
+                found.append((text, -priority))
+                continue
+            freq = int(nodes[index]["freq"])
+            if freq:
+                heapq.heappush(heap, (-freq, 0, index, text))
+            first = int(nodes[index]["first_child"])
+            for child in range(first, first + int(nodes[index]["child_count"])):
+                heapq.heappush(heap, (-int(nodes[child]["best"]), 1, child, text + chr(nodes[child]["char"])))
+        return found
+
+
+class WordPredictor:
+    """Ranks completions from a TrieDictionary plus the user's own word counts
+
+    A word the user has typed n times scores its dictionary frequency plus n times
+    user_weight. The default weight is a tenth of the most frequent word's count,
+    so ten uses put any word level with the dictionary's top word.
+    """
+
+    def __init__(self, dictionary, user_file=DEFAULT_USER_FILE, user_weight=None, save_interval=30):
+        self.dictionary = dictionary
+        self.user_file = user_file
+        self.user_weight = user_weight or max(int(dictionary.nodes[0]["best"]) // 10, 1)
+        self.save_interval = save_interval
+        self.user_counts = self._load_user_counts()
+        self.last_save = time.time()
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path=None, **options):
+        """Memory-map the dictionary at path, or fall back to a small built-in word list"""
+        if path and os.path.exists(path):
+            dictionary = TrieDictionary.open(path)
+        else:
+            dictionary = TrieDictionary.from_words({w: len(COMMON_WORDS) - i for i, w in enumerate(COMMON_WORDS)})
+        return cls(dictionary, **options)
+
+    @staticmethod
+    def current_word(text):
+        """The partially typed word at the end of text, lowercased"""
+        match = WORD_RE.search(text.lower())
+        return match.group(0) if match else ""
+
+    def predict(self, prefix, k=3):
+        prefix = prefix.lower()
+        # Pull extra dictionary candidates so user counts can reorder them
+        scores = {word: freq for word, freq in self.dictionary.complete(prefix, k * 3)}
+        for word, count in self.user_counts.items():
+            if word.startswith(prefix):
+                scores[word] = scores.get(word, self.dictionary.frequency(word))
+        for word in scores:
+            scores[word] += self.user_counts.get(word, 0) * self.user_weight
+        if len(scores) > k:
+            # A finished word needs no completion when there are others to offer
+            scores.pop(prefix, None)
+        return [word for word, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]]
+
+    def learn(self, word):
+        word = word.lower().strip("'")
+        if not word or not WORD_RE.fullmatch(word):
+            return
+        self.user_counts[word] = self.user_counts.get(word, 0) + 1
+        self.dirty = True
+        if time.time() - self.last_save > self.save_interval:
+            self.save()
+
+    def save(self):
+        if not self.dirty or not self.user_file:
+            return
+        try:
+            with open(self.user_file, "w") as f:
+                json.dump(self.user_counts, f)
+            self.dirty = False
+            self.last_save = time.time()
+        except OSError:
+            pass
+
+    def _load_user_counts(self):
+        try:
+            with open(self.user_file) as f:
+                return {str(word): int(count) for word, count in json.load(f).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query a keyboard word dictionary")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile a word list into a dictionary file")
+    build.add_argument("wordlist", help='text file with "word" or "word count" per line')
+    build.add_argument("output")
+    query = commands.add_parser("query", help="print completions for prefixes")
+    query.add_argument("dictionary")
+    query.add_argument("prefixes", nargs="+")
+    query.add_argument("-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = write_dictionary(read_word_list(args.wordlist), args.output)
+        print(f"Wrote {count} trie nodes to {args.output} ({os.path.getsize(args.output)} bytes)")
+    else:
+        dictionary = TrieDictionary.open(args.dictionary)
+        for prefix in args.prefixes:
+            print(f"{prefix}: {', '.join(f'{w} ({f})' for w, f in dictionary.complete(prefix.lower(), args.k))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())